@@ -1,10 +1,67 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+import asyncio
+import logging
 import uvicorn
 
 from app.routes import video
+from app.config import CORS_ORIGINS, CLEANUP_INTERVAL_HOURS, ENV, WEB_CONCURRENCY, TASK_QUEUE, LOG_LEVEL
 from app.utils.file_manager import ensure_directories_exist, cleanup_old_files
+from app.services.job_store import job_store
+from app.services.task_queue import init_task_queue, close_task_queue
+from app.services.transcriber import warm_whisper_model
+from app.websocket_manager import manager
+
+logging.basicConfig(level=LOG_LEVEL, format="%(levelname)s:%(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+# Backoff bounds for re-subscribing to status updates after a Redis error
+STATUS_RELAY_RETRY_MIN_SECONDS = 1.0
+STATUS_RELAY_RETRY_MAX_SECONDS = 30.0
+
+
+async def _cleanup_loop():
+    """
+    Periodically delete old temp files so the temp dir doesn't grow between restarts
+    """
+    while True:
+        await asyncio.to_thread(cleanup_old_files)
+        await asyncio.sleep(CLEANUP_INTERVAL_HOURS * 3600)
+
+
+async def _status_relay_loop():
+    """
+    Forward job status updates published by any process to this worker's WebSocket clients
+
+    Redis errors are logged and the subscription is re-established with
+    exponential backoff; only cancellation (shutdown) ends the loop.
+    """
+    delay = STATUS_RELAY_RETRY_MIN_SECONDS
+    while True:
+        try:
+            async for status_data in job_store.status_updates():
+                delay = STATUS_RELAY_RETRY_MIN_SECONDS
+                await manager.queue_status(status_data["job_id"], status_data)
+        except Exception:  # CancelledError is not an Exception, so shutdown still ends the loop
+            logger.exception("Job status subscription failed, re-subscribing in %.0fs", delay)
+        else:
+            logger.warning("Job status subscription ended, re-subscribing in %.0fs", delay)
+
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, STATUS_RELAY_RETRY_MAX_SECONDS)
+
+
+def _log_warm_result(task: asyncio.Task):
+    """Report the outcome of the background Whisper warm-up"""
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        logger.error("Whisper model warm-up failed (the first job will load it): %s", error)
+    elif task.result():
+        logger.info("Whisper model loaded")
 
 
 @asynccontextmanager
@@ -12,17 +69,32 @@ async def lifespan(app: FastAPI):
     """
     Lifespan event handler for startup and shutdown
     """
-    # Startup
-    print("Starting Caption Generator API...")
-    ensure_directories_exist()
-    print("Cleaning up old files...")
-    cleanup_old_files()
-    print("API ready!")
+    # Startup (inside the try, so tasks already started are stopped if a later step fails)
+    background_tasks = []
+    try:
+        print("Starting Caption Generator API...")
+        await asyncio.to_thread(ensure_directories_exist)
+        # Cleanup runs in the background so a slow disk scan doesn't delay startup
+        print("Scheduling periodic cleanup of old files...")
+        background_tasks.append(asyncio.create_task(_cleanup_loop()))
+        if job_store.shared:
+            background_tasks.append(asyncio.create_task(_status_relay_loop()))
+        await init_task_queue()
+        # Jobs run in this process: load Whisper in the background so the first one doesn't stall
+        if TASK_QUEUE != "arq":
+            warm_task = asyncio.create_task(asyncio.to_thread(warm_whisper_model))
+            warm_task.add_done_callback(_log_warm_result)
+            background_tasks.append(warm_task)
+        print("API ready!")
 
-    yield
+        yield
 
-    # Shutdown
-    print("Shutting down...")
+    finally:
+        # Shutdown
+        print("Shutting down...")
+        for task in background_tasks:
+            task.cancel()
+        await close_task_queue()
 
 
 # Create FastAPI app
@@ -30,13 +102,14 @@ app = FastAPI(
     title="Caption Generator API",
     description="Automatic video caption generation with speech-to-text",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS (allow frontend to access API)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify frontend URL
+    allow_origins=list(CORS_ORIGINS),  # Set CORS_ORIGINS to the frontend URL(s)
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -74,9 +147,18 @@ async def health():
 
 
 if __name__ == "__main__":
+    # Auto-reload only in dev; reload and multiple workers are mutually exclusive
+    dev = ENV == "dev"
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        reload=dev,
+        workers=None if dev else WEB_CONCURRENCY,
+        # WebSocket keepalive handled with protocol PING frames
+        ws_ping_interval=20,
+        ws_ping_timeout=20,
+        # Status messages are ~250 byte JSON text frames: per-connection deflate
+        # costs CPU per client on every broadcast for almost no bandwidth saved
+        ws_per_message_deflate=False
     )
@@ -1,10 +1,29 @@
-from pydantic import BaseModel, Field, HttpUrl
-from typing import Optional, List
-from enum import Enum
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
+from typing import Annotated, Literal, Optional, List, Union
+from enum import StrEnum
 from datetime import datetime
+from dataclasses import dataclass
+from functools import lru_cache
+import re
 
 
-class JobStatus(str, Enum):
+# Accepts watch, shorts, embed, live and youtu.be links (11-char video ID), with or
+# without scheme, any case and any youtube.com subdomain (www., m., music., ...)
+YT_URL_RE = re.compile(
+    r"^(?:https?://)?"
+    r"(?:(?:[\w-]+\.)?youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/|live/)|youtu\.be/)"
+    r"(?P<video_id>[\w-]{11})",
+    re.IGNORECASE
+)
+
+
+def _validate_youtube_url(url: str) -> str:
+    if not YT_URL_RE.match(url):
+        raise ValueError("Invalid YouTube URL")
+    return url
+
+
+class JobStatus(StrEnum):
     PENDING = "pending"
     DOWNLOADING = "downloading"
     TRANSCRIBING = "transcribing"
@@ -24,22 +43,41 @@ class CropConfig(BaseModel):
     source_height: int = Field(..., description="Original video height")
 
 
-class VideoMetadata(BaseModel):
-    """Video metadata extracted without downloading"""
+class _VideoMetadataBase(BaseModel):
+    """Fields shared by every video source"""
     title: str
     duration: float  # seconds
     width: int
     height: int
     thumbnail_url: str
-    embed_url: Optional[str] = None  # YouTube embed URL
-    video_id: Optional[str] = None  # YouTube video ID
-    preview_url: Optional[str] = None  # For uploaded files
-    source_type: str = "youtube"  # "youtube" or "upload"
+
+
+class YouTubeMetadata(_VideoMetadataBase):
+    """Video metadata extracted from YouTube without downloading"""
+    source_type: Literal["youtube"] = "youtube"
+    embed_url: str  # YouTube embed URL
+    video_id: str  # YouTube video ID
+
+
+class UploadMetadata(_VideoMetadataBase):
+    """Video metadata extracted from an uploaded file"""
+    source_type: Literal["upload"] = "upload"
+    preview_url: str  # Streaming URL for the trimmer page
+    original_filename: Optional[str] = None
+
+
+# Discriminated on source_type so pydantic-core only validates the matching branch
+VideoMetadata = Annotated[Union[YouTubeMetadata, UploadMetadata], Field(discriminator="source_type")]
 
 
 class ExtractMetadataRequest(BaseModel):
     url: str = Field(..., description="YouTube video URL")
 
+    @field_validator("url")
+    @classmethod
+    def check_youtube_url(cls, url: str) -> str:
+        return _validate_youtube_url(url)
+
 
 class ProcessUrlRequest(BaseModel):
     url: str = Field(..., description="YouTube video URL")
@@ -47,6 +85,11 @@ class ProcessUrlRequest(BaseModel):
     end_time: Optional[float] = Field(None, description="Trim end time in seconds")
     crop: Optional[CropConfig] = Field(None, description="Crop configuration")
 
+    @field_validator("url")
+    @classmethod
+    def check_youtube_url(cls, url: str) -> str:
+        return _validate_youtube_url(url)
+
 
 class ProcessUploadRequest(BaseModel):
     start_time: Optional[float] = Field(None, description="Trim start time in seconds")
@@ -81,6 +124,18 @@ class WordTimestamp(BaseModel):
     end: float
 
 
+WORD_LIST_ADAPTER = TypeAdapter(List[WordTimestamp])
+
+
+@lru_cache(maxsize=8192)
+def _fmt_ms(ms: int) -> str:
+    """Format a millisecond count as an SRT timestamp (cached: adjacent captions share boundaries)"""
+    hours, rem = divmod(ms, 3_600_000)
+    minutes, rem = divmod(rem, 60_000)
+    secs, millis = divmod(rem, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
 class Caption(BaseModel):
     text: str
     start: float
@@ -88,11 +143,7 @@ class Caption(BaseModel):
 
     def to_srt_time(self, seconds: float) -> str:
         """Convert seconds to SRT timestamp format (HH:MM:SS,mmm)"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        millis = int((seconds % 1) * 1000)
-        return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+        return _fmt_ms(round(seconds * 1000))
 
     def to_srt_entry(self, index: int) -> str:
         """Convert caption to SRT format entry"""
@@ -100,19 +151,34 @@ class Caption(BaseModel):
         end_time = self.to_srt_time(self.end)
         return f"{index}\n{start_time} --> {end_time}\n{self.text}\n"
 
+    @staticmethod
+    def render_srt(captions: List["Caption"]) -> str:
+        """Render a full SRT document (entries separated by blank lines) in one join"""
+        return "".join(
+            f"{i}\n{cap.to_srt_time(cap.start)} --> {cap.to_srt_time(cap.end)}\n{cap.text}\n\n"
+            for i, cap in enumerate(captions, 1)
+        )
 
-class JobData(BaseModel):
-    """Internal job data structure"""
+
+# Validates a whole list of caption dicts in one pydantic-core call
+CAPTION_LIST_ADAPTER = TypeAdapter(List[Caption])
+
+
+@dataclass(slots=True, kw_only=True)
+class JobData:
+    """Internal job data structure (never serialized, so not a Pydantic model)"""
     job_id: str
     status: JobStatus
     progress: int = 0
     message: Optional[str] = None
-    created_at: datetime
-    completed_at: Optional[datetime] = None
+    created_at: float  # epoch seconds, converted to datetime at the response edge
+    completed_at: Optional[float] = None
     video_path: Optional[str] = None
     output_path: Optional[str] = None
     error: Optional[str] = None
     captions: Optional[List[Caption]] = None
+    # Pre-serialized GET /captions response body, rebuilt whenever captions change
+    captions_json: Optional[bytes] = None
     srt_path: Optional[str] = None
     # Trim/crop settings
     start_time: Optional[float] = None
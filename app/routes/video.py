@@ -1,11 +1,18 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from pathlib import Path
-import uuid
+import os
+import sys
 from datetime import datetime
-from typing import Dict
+import time
+from typing import Optional
 import asyncio
+import hashlib
 from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import attrgetter
+import aiofiles
+import orjson
 
 from app.models import (
     ProcessUrlRequest,
@@ -17,46 +24,98 @@ from app.models import (
     Caption,
     ExtractMetadataRequest,
     VideoMetadata,
+    UploadMetadata,
     CropConfig,
     UploadPreviewResponse
 )
-from app.services.downloader import download_youtube, validate_youtube_url, extract_video_metadata, DownloaderError
+from app.services.downloader import download_youtube, extract_video_metadata_cached, invalidate_video_metadata, DownloaderError
 from app.services.transcriber import transcribe_audio, TranscriberError
 from app.services.segmenter import segment_captions
-from app.services.renderer import burn_captions, RendererError
-from app.utils.file_manager import delete_job_files
+from app.services.renderer import burn_captions, write_srt_file, RendererError
+from app.utils.file_manager import delete_job_files, register_job_file
 from app.config import UPLOAD_DIR, MAX_UPLOAD_SIZE, ALLOWED_VIDEO_EXTENSIONS, TEMP_DIR, OUTPUT_DIR
+from app.services.job_store import job_store
+from app.services.task_queue import enqueue_job
 from app.websocket_manager import manager
 
 router = APIRouter(prefix="/api", tags=["video"])
 
-# In-memory job storage (use Redis/database in production)
-jobs: Dict[str, JobData] = {}
+# Separate pools so quick network/metadata calls never queue behind
+# long-running transcription and FFmpeg renders
+io_pool = ThreadPoolExecutor(max_workers=8)  # yt-dlp download/metadata
+cpu_pool = ThreadPoolExecutor(max_workers=4)  # Whisper, FFmpeg trim/crop/burn
 
-# Thread pool for blocking IO operations
-thread_pool = ThreadPoolExecutor(max_workers=4)
+# Uploads are streamed to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
 
+# File-to-file sendfile is only reliable on Linux
+USE_SENDFILE = hasattr(os, 'sendfile') and sys.platform.startswith('linux')
+
+
+class LargeChunkFileResponse(FileResponse):
+    """FileResponse that streams in 1MB chunks (default is 64KB) for large videos"""
+    chunk_size = 1024 * 1024
+
+
+def new_job_id() -> str:
+    """Random UUID4 string built directly from os.urandom (no uuid.UUID object)"""
+    b = bytearray(os.urandom(16))
+    b[6] = (b[6] & 0x0F) | 0x40  # version 4
+    b[8] = (b[8] & 0x3F) | 0x80  # RFC 4122 variant
+    h = b.hex()
+    return f"{h[0:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+
+
+@lru_cache(maxsize=1024)
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    """Convert an internal epoch timestamp to an ISO string for status payloads
+
+    Cached because every status update of a job re-formats the same created_at.
+    """
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None
 
-def extract_local_video_metadata(video_path: str, filename: str = "video") -> VideoMetadata:
-    """Extract metadata from a local video file using ffprobe"""
-    import subprocess
-    import json
 
-    # Get video info using ffprobe
-    cmd = [
+def _status_payload(job: JobData) -> dict:
+    """Build the WebSocket status message for a job (single dict, no model validation)"""
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "progress": job.progress,
+        "message": job.message,
+        "created_at": _isoformat(job.created_at),
+        "completed_at": _isoformat(job.completed_at),
+        "download_url": f"/api/download/{job.job_id}" if job.status == JobStatus.COMPLETED else None
+    }
+
+
+def _captions_fields(job_id: str, captions: list[Caption]) -> dict:
+    """Job fields for new captions, including the pre-serialized GET /captions body"""
+    captions_json = orjson.dumps({
+        "job_id": job_id,
+        "captions": [{"text": c.text, "start": c.start, "end": c.end} for c in captions],
+        "total_segments": len(captions)
+    })
+    return {"captions": captions, "captions_json": captions_json}
+
+
+async def extract_local_video_metadata(video_path: str, preview_url: str, filename: str = "video") -> UploadMetadata:
+    """Extract metadata from a local video file using ffprobe"""
+    # Get video info using ffprobe (awaited directly - no thread pool slot needed)
+    proc = await asyncio.create_subprocess_exec(
         'ffprobe',
         '-v', 'quiet',
         '-print_format', 'json',
         '-show_format',
         '-show_streams',
-        video_path
-    ]
-
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise Exception(f"ffprobe failed: {result.stderr}")
+        video_path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        raise Exception(f"ffprobe failed: {stderr.decode(errors='replace')}")
 
-    info = json.loads(result.stdout)
+    info = orjson.loads(stdout)
 
     # Find video stream
     video_stream = None
@@ -76,17 +135,80 @@ def extract_local_video_metadata(video_path: str, filename: str = "video") -> Vi
     # Get title from filename
     title = Path(filename).stem if filename else "Uploaded Video"
 
-    return VideoMetadata(
+    return UploadMetadata(
         title=title,
         duration=duration,
         width=width,
         height=height,
         thumbnail_url="",  # No thumbnail for uploads
-        embed_url=None,
-        video_id=None,
-        preview_url=None,  # Will be set by endpoint
-        source_type="upload"
+        preview_url=preview_url,
+        original_filename=filename
+    )
+
+
+def _copy_file_kernel(src, upload_path: Path) -> int:
+    """Copy an on-disk file object to upload_path with sendfile (no userspace buffers)"""
+    src_fd = src.fileno()
+    size = os.fstat(src_fd).st_size
+    offset = 0
+    with open(upload_path, 'wb') as dst:
+        dst_fd = dst.fileno()
+        while offset < size:
+            sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+    return offset
+
+
+async def save_upload_file(file: UploadFile, upload_path: Path, hasher=None) -> int:
+    """
+    Save an uploaded file to disk
+
+    Starlette has already spooled the multipart body into a temp file. If it
+    rolled over to disk, the bytes are copied kernel-side with sendfile on
+    Linux; otherwise they are streamed in fixed-size chunks. When a hasher is
+    given the bytes have to pass through userspace anyway, so the chunked copy
+    hashes them on the way (one read) instead of sendfile plus a second read.
+
+    Args:
+        file: Uploaded file
+        upload_path: Destination path
+        hasher: Optional hashlib object updated with the file contents
+
+    Returns:
+        Number of bytes written
+
+    Raises:
+        HTTPException: If the file exceeds MAX_UPLOAD_SIZE (partial file is removed)
+    """
+    too_large = HTTPException(
+        status_code=400,
+        detail=f"File too large. Max size: {MAX_UPLOAD_SIZE / 1024 / 1024:.0f}MB"
     )
+    if file.size is not None and file.size > MAX_UPLOAD_SIZE:
+        raise too_large
+
+    # SpooledTemporaryFile only has a real fd once it rolled over to disk
+    # (calling fileno() earlier would force the rollover)
+    if hasher is None and USE_SENDFILE and getattr(file.file, '_rolled', False):
+        total = await asyncio.to_thread(_copy_file_kernel, file.file, upload_path)
+    else:
+        total = 0
+        async with aiofiles.open(upload_path, 'wb') as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                total += len(chunk)
+                if total > MAX_UPLOAD_SIZE:
+                    break
+                if hasher is not None:
+                    hasher.update(chunk)
+                await f.write(chunk)
+
+    if total > MAX_UPLOAD_SIZE:
+        upload_path.unlink(missing_ok=True)
+        raise too_large
+
+    return total
 
 
 def generate_srt_file(captions: list[Caption], output_path: Path) -> None:
@@ -97,20 +219,8 @@ def generate_srt_file(captions: list[Caption], output_path: Path) -> None:
         captions: List of Caption objects
         output_path: Path to save the SRT file
     """
-    def format_timestamp(seconds: float) -> str:
-        """Convert seconds to SRT timestamp format HH:MM:SS,mmm"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        millis = int((seconds % 1) * 1000)
-        return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
-
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, 'w', encoding='utf-8') as f:
-        for i, caption in enumerate(captions, 1):
-            f.write(f"{i}\n")
-            f.write(f"{format_timestamp(caption.start)} --> {format_timestamp(caption.end)}\n")
-            f.write(f"{caption.text}\n\n")
+    write_srt_file(captions, output_path)
 
 
 async def render_video_with_captions(job_id: str):
@@ -120,11 +230,10 @@ async def render_video_with_captions(job_id: str):
     Args:
         job_id: Job ID
     """
-    if job_id not in jobs:
+    job = await job_store.get(job_id)
+    if job is None:
         return
 
-    job = jobs[job_id]
-
     if not job.captions or not job.video_path:
         await update_job_status(job_id, JobStatus.FAILED, 0, "Missing captions or video")
         return
@@ -138,51 +247,53 @@ async def render_video_with_captions(job_id: str):
 
         # Burn captions with FFmpeg in thread pool
         loop = asyncio.get_event_loop()
-        output_path = await loop.run_in_executor(thread_pool, burn_captions, job.video_path, job.captions, job_id)
-
-        job.output_path = output_path
+        output_path = await loop.run_in_executor(cpu_pool, burn_captions, job.video_path, job.captions, job_id)
+        register_job_file(job_id, output_path)
 
         # Cleanup SRT files
         srt_path.unlink(missing_ok=True)
         if job.srt_path:
             Path(job.srt_path).unlink(missing_ok=True)
 
-        await update_job_status(job_id, JobStatus.COMPLETED, 100, "Processing complete!")
-        job.completed_at = datetime.now()
+        await update_job_status(
+            job_id, JobStatus.COMPLETED, 100, "Processing complete!",
+            output_path=output_path, completed_at=time.time()
+        )
 
     except RendererError as e:
-        await update_job_status(job_id, JobStatus.FAILED, 0, f"Rendering failed: {str(e)}")
-        job.error = str(e)
+        await update_job_status(job_id, JobStatus.FAILED, 0, f"Rendering failed: {str(e)}", error=str(e))
     except Exception as e:
-        await update_job_status(job_id, JobStatus.FAILED, 0, f"Rendering failed: {str(e)}")
-        job.error = str(e)
+        await update_job_status(job_id, JobStatus.FAILED, 0, f"Rendering failed: {str(e)}", error=str(e))
 
 
-async def update_job_status(job_id: str, status: JobStatus, progress: int, message: str):
-    """Update job status and broadcast to WebSocket clients"""
-    jobs[job_id].status = status
-    jobs[job_id].progress = progress
-    jobs[job_id].message = message
+async def update_job_status(job_id: str, status: JobStatus, progress: int, message: str, **fields):
+    """
+    Update job status and broadcast to WebSocket clients
 
-    # Broadcast to WebSocket clients
-    await manager.broadcast_status(job_id, {
-        "job_id": job_id,
-        "status": status,
-        "progress": progress,
-        "message": message,
-        "created_at": jobs[job_id].created_at.isoformat(),
-        "completed_at": jobs[job_id].completed_at.isoformat() if jobs[job_id].completed_at else None,
-        "download_url": f"/api/download/{job_id}" if status == JobStatus.COMPLETED else None
-    })
+    Extra keyword fields (e.g. error, output_path) are stored in the same job store update.
+    """
+    job = await job_store.update_fields(job_id, status=status, progress=progress, message=message, **fields)
+    if job is None:
+        return
 
+    # Broadcast to WebSocket clients (bursts of intermediate updates are coalesced).
+    # With a shared store the job may run in another process, so publish and let
+    # every API worker relay it to its own clients.
+    if job_store.shared:
+        await job_store.publish_status(_status_payload(job))
+    else:
+        await manager.queue_status(job_id, _status_payload(job))
 
-async def process_video_job(job_id: str, video_path: str):
+
+async def process_video_job(job_id: str, video_path: str, content_hash: Optional[str] = None):
     """
     Background task to process video: transcribe + segment, then wait for editing
 
     Args:
         job_id: Job ID
         video_path: Path to video file
+        content_hash: Upload content hash; if given, the generated captions are
+            remembered so identical uploads can skip transcription
     """
     try:
         # Update status: processing started
@@ -193,12 +304,14 @@ async def process_video_job(job_id: str, video_path: str):
 
         # Transcribe in thread pool
         loop = asyncio.get_event_loop()
-        words = await loop.run_in_executor(thread_pool, transcribe_audio, video_path)
+        words = await loop.run_in_executor(cpu_pool, transcribe_audio, video_path)
 
         # Check if any words were transcribed
         if not words or len(words) == 0:
-            jobs[job_id].error = "No words transcribed from audio"
-            await update_job_status(job_id, JobStatus.FAILED, 0, "No speech detected in video. Cannot generate captions.")
+            await update_job_status(
+                job_id, JobStatus.FAILED, 0, "No speech detected in video. Cannot generate captions.",
+                error="No words transcribed from audio"
+            )
             return
 
         # Update status: segmenting
@@ -207,21 +320,22 @@ async def process_video_job(job_id: str, video_path: str):
         # Segment captions
         captions = segment_captions(words)
 
-        # STOP HERE - Store captions and wait for user editing
-        job = jobs[job_id]
-        job.captions = captions
-
         # Generate SRT file for preview/download
         srt_path = OUTPUT_DIR / f"{job_id}_captions.srt"
         generate_srt_file(captions, srt_path)
-        job.srt_path = str(srt_path)
+        register_job_file(job_id, srt_path)
 
-        # Move to EDITING state
+        if content_hash:
+            await job_store.set_captions_for_hash(content_hash, captions)
+
+        # STOP HERE - Store captions and move to EDITING state
         await update_job_status(
             job_id,
             JobStatus.EDITING,
             65,
-            "Captions ready for editing"
+            "Captions ready for editing",
+            srt_path=str(srt_path),
+            **_captions_fields(job_id, captions)
         )
 
         # DO NOT continue to rendering - wait for user action
@@ -230,11 +344,117 @@ async def process_video_job(job_id: str, video_path: str):
         # - POST /captions/{job_id}/skip (skip editing)
 
     except TranscriberError as e:
-        jobs[job_id].error = str(e)
-        await update_job_status(job_id, JobStatus.FAILED, 0, f"Transcription failed: {str(e)}")
+        await update_job_status(job_id, JobStatus.FAILED, 0, f"Transcription failed: {str(e)}", error=str(e))
+    except Exception as e:
+        await update_job_status(job_id, JobStatus.FAILED, 0, f"Processing failed: {str(e)}", error=str(e))
+
+
+async def process_with_settings(
+    job_id: str,
+    video_path: str,
+    start_time: Optional[float],
+    end_time: Optional[float],
+    crop: Optional[CropConfig]
+):
+    """
+    Background task for uploaded videos: apply trim/crop, then transcribe + segment
+
+    Args:
+        job_id: Job ID
+        video_path: Path to the uploaded video
+        start_time: Trim start in seconds (trim applies only if both bounds are set)
+        end_time: Trim end in seconds
+        crop: Optional crop region
+    """
+    try:
+        # Apply trim and/or crop in a single FFmpeg pass
+        trim = start_time is not None and end_time is not None
+        if trim or crop:
+            if trim and crop:
+                message = "Trimming and cropping video..."
+            elif trim:
+                message = "Trimming video..."
+            else:
+                message = "Applying crop..."
+            await update_job_status(job_id, JobStatus.PENDING, 5, message)
+            from app.services.renderer import trim_and_crop_video
+            loop = asyncio.get_event_loop()
+            video_path = await loop.run_in_executor(
+                cpu_pool,
+                trim_and_crop_video,
+                video_path,
+                job_id,
+                start_time,
+                end_time,
+                crop
+            )
+            register_job_file(job_id, video_path)
+            await job_store.update_fields(job_id, video_path=video_path)
+
+        # Process video (transcribe + segment)
+        await process_video_job(job_id, video_path)
+
+    except Exception as e:
+        await update_job_status(job_id, JobStatus.FAILED, 0, f"Processing failed: {str(e)}", error=str(e))
+
+
+async def download_and_process(
+    job_id: str,
+    url: str,
+    start_time: Optional[float],
+    end_time: Optional[float],
+    crop: Optional[CropConfig]
+):
+    """
+    Background task for YouTube jobs: download (optionally a time range), crop, then transcribe + segment
+
+    Args:
+        job_id: Job ID
+        url: YouTube URL
+        start_time: Optional download range start in seconds
+        end_time: Optional download range end in seconds
+        crop: Optional crop region
+    """
+    try:
+        # Broadcast download start
+        await update_job_status(job_id, JobStatus.DOWNLOADING, 5, "Downloading video from YouTube...")
+
+        # Download video in thread pool with optional time range
+        loop = asyncio.get_event_loop()
+        video_path = await loop.run_in_executor(
+            io_pool,
+            download_youtube,
+            url,
+            job_id,
+            start_time,
+            end_time
+        )
+        register_job_file(job_id, video_path)
+        await update_job_status(job_id, JobStatus.DOWNLOADING, 15, "Download completed", video_path=video_path)
+
+        # Apply crop if specified
+        if crop:
+            from app.services.renderer import crop_video
+            await update_job_status(job_id, JobStatus.DOWNLOADING, 18, "Applying crop...")
+            cropped_path = await loop.run_in_executor(
+                cpu_pool,
+                crop_video,
+                video_path,
+                crop,
+                job_id
+            )
+            register_job_file(job_id, cropped_path)
+            await job_store.update_fields(job_id, video_path=cropped_path)
+            video_path = cropped_path
+
+        # Process video
+        await process_video_job(job_id, video_path)
+
+    except DownloaderError as e:
+        invalidate_video_metadata(url)
+        await update_job_status(job_id, JobStatus.FAILED, 0, f"Download failed: {str(e)}", error=str(e))
     except Exception as e:
-        jobs[job_id].error = str(e)
-        await update_job_status(job_id, JobStatus.FAILED, 0, f"Processing failed: {str(e)}")
+        await update_job_status(job_id, JobStatus.FAILED, 0, f"Failed: {str(e)}", error=str(e))
 
 
 @router.post("/upload", response_model=JobResponse)
@@ -256,40 +476,60 @@ async def upload_video(
         )
 
     # Generate job ID
-    job_id = str(uuid.uuid4())
+    job_id = new_job_id()
 
     # Save uploaded file
     upload_path = UPLOAD_DIR / f"{job_id}{file_ext}"
 
-    try:
-        # Read and save file
-        content = await file.read()
-
-        # Check file size
-        if len(content) > MAX_UPLOAD_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Max size: {MAX_UPLOAD_SIZE / 1024 / 1024:.0f}MB"
-            )
+    hasher = hashlib.blake2b(digest_size=32)
 
-        with open(upload_path, 'wb') as f:
-            f.write(content)
+    try:
+        # Stream file to disk (enforces size limit)
+        await save_upload_file(file, upload_path, hasher)
+        register_job_file(job_id, upload_path)
 
+    except HTTPException:
+        raise
     except Exception as e:
+        upload_path.unlink(missing_ok=True)
         raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
 
+    content_hash = hasher.hexdigest()
+
+    # Identical file uploaded before: reuse its auto-generated captions
+    captions = await job_store.get_captions_for_hash(content_hash)
+    if captions is not None:
+        srt_path = OUTPUT_DIR / f"{job_id}_captions.srt"
+        generate_srt_file(captions, srt_path)
+        register_job_file(job_id, srt_path)
+        await job_store.set(JobData(
+            job_id=job_id,
+            status=JobStatus.EDITING,
+            progress=65,
+            message="Captions ready for editing",
+            created_at=time.time(),
+            video_path=str(upload_path),
+            srt_path=str(srt_path),
+            **_captions_fields(job_id, captions)
+        ))
+        return JobResponse(
+            job_id=job_id,
+            status=JobStatus.EDITING,
+            message="Video uploaded successfully"
+        )
+
     # Create job entry
-    jobs[job_id] = JobData(
+    await job_store.set(JobData(
         job_id=job_id,
         status=JobStatus.PENDING,
         progress=10,
         message="Video uploaded, processing...",
-        created_at=datetime.now(),
+        created_at=time.time(),
         video_path=str(upload_path)
-    )
+    ))
 
     # Start background processing
-    background_tasks.add_task(process_video_job, job_id, str(upload_path))
+    await enqueue_job(background_tasks, process_video_job, job_id, str(upload_path), content_hash)
 
     return JobResponse(
         job_id=job_id,
@@ -305,17 +545,10 @@ async def extract_metadata(request: ExtractMetadataRequest):
 
     Returns video info for trimmer preview page.
     """
-    # Validate YouTube URL
-    if not validate_youtube_url(request.url):
-        raise HTTPException(
-            status_code=400,
-            detail="Invalid YouTube URL"
-        )
-
     try:
         # Extract metadata in thread pool
         loop = asyncio.get_event_loop()
-        metadata = await loop.run_in_executor(thread_pool, extract_video_metadata, request.url)
+        metadata = await loop.run_in_executor(io_pool, extract_video_metadata_cached, request.url)
         return metadata
     except DownloaderError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -342,37 +575,23 @@ async def upload_video_for_preview(
         )
 
     # Generate job ID
-    job_id = str(uuid.uuid4())
+    job_id = new_job_id()
 
     # Save uploaded file
     upload_path = UPLOAD_DIR / f"{job_id}{file_ext}"
 
     try:
-        # Read and save file
-        content = await file.read()
-
-        # Check file size
-        if len(content) > MAX_UPLOAD_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Max size: {MAX_UPLOAD_SIZE / 1024 / 1024:.0f}MB"
-            )
-
-        with open(upload_path, 'wb') as f:
-            f.write(content)
+        # Stream file to disk (enforces size limit)
+        await save_upload_file(file, upload_path)
+        register_job_file(job_id, upload_path)
 
         # Extract metadata from uploaded file
-        loop = asyncio.get_event_loop()
-        metadata = await loop.run_in_executor(
-            thread_pool,
-            extract_local_video_metadata,
+        metadata = await extract_local_video_metadata(
             str(upload_path),
+            f"/api/preview-upload/{job_id}",
             file.filename
         )
 
-        # Set preview URL
-        metadata.preview_url = f"/api/preview-upload/{job_id}"
-
     except HTTPException:
         raise
     except Exception as e:
@@ -381,16 +600,16 @@ async def upload_video_for_preview(
         raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
 
     # Create job entry (waiting for trimmer confirmation)
-    jobs[job_id] = JobData(
+    await job_store.set(JobData(
         job_id=job_id,
         status=JobStatus.PENDING,
         progress=0,
         message="Waiting for trim/crop settings...",
-        created_at=datetime.now(),
+        created_at=time.time(),
         video_path=str(upload_path),
         source_type="upload",
         original_filename=file.filename
-    )
+    ))
 
     return UploadPreviewResponse(
         job_id=job_id,
@@ -405,15 +624,14 @@ async def preview_upload(job_id: str):
 
     Used before processing starts, for trim/crop selection.
     """
-    if job_id not in jobs:
+    job = await job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = jobs[job_id]
-
     if not job.video_path or not Path(job.video_path).exists():
         raise HTTPException(status_code=404, detail="Video file not found")
 
-    return FileResponse(
+    return LargeChunkFileResponse(
         path=job.video_path,
         media_type="video/mp4"
     )
@@ -430,62 +648,26 @@ async def process_uploaded_video(
 
     Called after trimmer page confirms settings.
     """
-    if job_id not in jobs:
+    job = await job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = jobs[job_id]
-
     if not job.video_path or not Path(job.video_path).exists():
         raise HTTPException(status_code=404, detail="Video file not found")
 
     # Update job with trim/crop settings
-    job.start_time = request.start_time
-    job.end_time = request.end_time
-    job.crop = request.crop
+    await job_store.update_fields(
+        job_id,
+        start_time=request.start_time,
+        end_time=request.end_time,
+        crop=request.crop
+    )
 
     # Start background task to process video
-    async def process_with_settings():
-        try:
-            video_path = job.video_path
-            loop = asyncio.get_event_loop()
-
-            # Apply trim if specified
-            if request.start_time is not None and request.end_time is not None:
-                await update_job_status(job_id, JobStatus.PENDING, 5, "Trimming video...")
-                from app.services.renderer import trim_video
-                trimmed_path = await loop.run_in_executor(
-                    thread_pool,
-                    trim_video,
-                    video_path,
-                    request.start_time,
-                    request.end_time,
-                    job_id
-                )
-                job.video_path = trimmed_path
-                video_path = trimmed_path
-
-            # Apply crop if specified
-            if request.crop:
-                await update_job_status(job_id, JobStatus.PENDING, 10, "Applying crop...")
-                from app.services.renderer import crop_video
-                cropped_path = await loop.run_in_executor(
-                    thread_pool,
-                    crop_video,
-                    video_path,
-                    request.crop,
-                    job_id
-                )
-                job.video_path = cropped_path
-                video_path = cropped_path
-
-            # Process video (transcribe + segment)
-            await process_video_job(job_id, video_path)
-
-        except Exception as e:
-            job.error = str(e)
-            await update_job_status(job_id, JobStatus.FAILED, 0, f"Processing failed: {str(e)}")
-
-    background_tasks.add_task(process_with_settings)
+    await enqueue_job(
+        background_tasks, process_with_settings,
+        job_id, job.video_path, request.start_time, request.end_time, request.crop
+    )
 
     return JobResponse(
         job_id=job_id,
@@ -504,73 +686,27 @@ async def process_url(
 
     Returns job_id for status tracking
     """
-    # Validate YouTube URL
-    if not validate_youtube_url(request.url):
-        raise HTTPException(
-            status_code=400,
-            detail="Invalid YouTube URL"
-        )
-
     # Generate job ID
-    job_id = str(uuid.uuid4())
+    job_id = new_job_id()
 
     # Create job entry with trim/crop settings
-    jobs[job_id] = JobData(
+    await job_store.set(JobData(
         job_id=job_id,
         status=JobStatus.DOWNLOADING,
         progress=0,
         message="Downloading video from YouTube...",
-        created_at=datetime.now(),
+        created_at=time.time(),
         start_time=request.start_time,
         end_time=request.end_time,
         crop=request.crop,
         source_type="youtube"
-    )
+    ))
 
     # Start background task
-    async def download_and_process():
-        try:
-            # Broadcast download start
-            await update_job_status(job_id, JobStatus.DOWNLOADING, 5, "Downloading video from YouTube...")
-
-            # Download video in thread pool with optional time range
-            loop = asyncio.get_event_loop()
-            video_path = await loop.run_in_executor(
-                thread_pool,
-                download_youtube,
-                request.url,
-                job_id,
-                request.start_time,
-                request.end_time
-            )
-            jobs[job_id].video_path = video_path
-            await update_job_status(job_id, JobStatus.DOWNLOADING, 15, "Download completed")
-
-            # Apply crop if specified
-            if request.crop:
-                from app.services.renderer import crop_video
-                await update_job_status(job_id, JobStatus.DOWNLOADING, 18, "Applying crop...")
-                cropped_path = await loop.run_in_executor(
-                    thread_pool,
-                    crop_video,
-                    video_path,
-                    request.crop,
-                    job_id
-                )
-                jobs[job_id].video_path = cropped_path
-                video_path = cropped_path
-
-            # Process video
-            await process_video_job(job_id, video_path)
-
-        except DownloaderError as e:
-            jobs[job_id].error = str(e)
-            await update_job_status(job_id, JobStatus.FAILED, 0, f"Download failed: {str(e)}")
-        except Exception as e:
-            jobs[job_id].error = str(e)
-            await update_job_status(job_id, JobStatus.FAILED, 0, f"Failed: {str(e)}")
-
-    background_tasks.add_task(download_and_process)
+    await enqueue_job(
+        background_tasks, download_and_process,
+        job_id, request.url, request.start_time, request.end_time, request.crop
+    )
 
     return JobResponse(
         job_id=job_id,
@@ -584,11 +720,10 @@ async def get_status(job_id: str):
     """
     Get job processing status
     """
-    if job_id not in jobs:
+    job = await job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = jobs[job_id]
-
     # Build download URL if completed
     download_url = None
     if job.status == JobStatus.COMPLETED and job.output_path:
@@ -599,8 +734,8 @@ async def get_status(job_id: str):
         status=job.status,
         progress=job.progress,
         message=job.message,
-        created_at=job.created_at,
-        completed_at=job.completed_at,
+        created_at=datetime.fromtimestamp(job.created_at),
+        completed_at=datetime.fromtimestamp(job.completed_at) if job.completed_at is not None else None,
         download_url=download_url
     )
 
@@ -612,11 +747,10 @@ async def preview_video(job_id: str):
 
     Does NOT auto-cleanup - use for video playback
     """
-    if job_id not in jobs:
+    job = await job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = jobs[job_id]
-
     if job.status != JobStatus.COMPLETED:
         raise HTTPException(status_code=400, detail="Video processing not completed")
 
@@ -624,7 +758,7 @@ async def preview_video(job_id: str):
         raise HTTPException(status_code=404, detail="Output file not found")
 
     # Return file for inline preview (no cleanup)
-    return FileResponse(
+    return LargeChunkFileResponse(
         path=job.output_path,
         media_type="video/mp4"
     )
@@ -637,11 +771,10 @@ async def download_video(job_id: str, background_tasks: BackgroundTasks):
 
     Automatically cleans up files after download
     """
-    if job_id not in jobs:
+    job = await job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = jobs[job_id]
-
     if job.status != JobStatus.COMPLETED:
         raise HTTPException(status_code=400, detail="Video processing not completed")
 
@@ -650,9 +783,9 @@ async def download_video(job_id: str, background_tasks: BackgroundTasks):
 
     # Schedule cleanup after download
     background_tasks.add_task(delete_job_files, job_id)
-    background_tasks.add_task(lambda: jobs.pop(job_id, None))
+    background_tasks.add_task(job_store.delete, job_id)
 
-    return FileResponse(
+    return LargeChunkFileResponse(
         path=job.output_path,
         filename=f"captioned_{job_id}.mp4",
         media_type="video/mp4"
@@ -665,19 +798,16 @@ async def get_captions(job_id: str):
     Retrieve captions for editing
     Returns JSON array of caption objects
     """
-    if job_id not in jobs:
+    job = await job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = jobs[job_id]
-
     if not job.captions:
         raise HTTPException(status_code=400, detail="Captions not yet generated")
 
-    return {
-        "job_id": job_id,
-        "captions": [caption.dict() for caption in job.captions],
-        "total_segments": len(job.captions)
-    }
+    # Serve the body serialized when the captions were stored (no per-request encoding)
+    payload = job.captions_json or _captions_fields(job_id, job.captions)["captions_json"]
+    return Response(content=payload, media_type="application/json")
 
 
 @router.post("/captions/{job_id}")
@@ -690,11 +820,10 @@ async def update_captions(
     Accept edited captions and continue to rendering
     Validates timestamps, updates job, starts rendering
     """
-    if job_id not in jobs:
+    job = await job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = jobs[job_id]
-
     if job.status != JobStatus.EDITING:
         raise HTTPException(
             status_code=400,
@@ -705,27 +834,29 @@ async def update_captions(
     if not captions:
         raise HTTPException(status_code=400, detail="Captions cannot be empty")
 
-    for i, cap in enumerate(captions):
-        if cap.start >= cap.end:
+    for i, cap in enumerate(captions, 1):
+        start = cap.start
+        if start >= cap.end:
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid timing in segment {i+1}: start >= end"
+                detail=f"Invalid timing in segment {i}: start >= end"
             )
-        if cap.start < 0:
+        if start < 0:
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid timing in segment {i+1}: negative start time"
+                detail=f"Invalid timing in segment {i}: negative start time"
             )
 
-    # Sort by start time
-    captions.sort(key=lambda x: x.start)
+    # Sort by start time (C-level key getter, stable)
+    captions.sort(key=attrgetter("start"))
 
     # Update job with edited captions
-    job.captions = captions
-    await update_job_status(job_id, JobStatus.RENDERING, 70, "Rendering video with captions...")
+    await update_job_status(job_id, JobStatus.RENDERING, 70, "Rendering video with captions...",
+        **_captions_fields(job_id, captions)
+    )
 
     # Start rendering in background
-    background_tasks.add_task(render_video_with_captions, job_id)
+    await enqueue_job(background_tasks, render_video_with_captions, job_id)
 
     return {"status": "success", "message": "Rendering started"}
 
@@ -735,16 +866,15 @@ async def skip_caption_editing(job_id: str, background_tasks: BackgroundTasks):
     """
     Skip editing and use original captions for rendering
     """
-    if job_id not in jobs:
+    job = await job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = jobs[job_id]
-
     if job.status != JobStatus.EDITING:
         raise HTTPException(status_code=400, detail="Job not in editing state")
 
     await update_job_status(job_id, JobStatus.RENDERING, 70, "Rendering video with captions...")
-    background_tasks.add_task(render_video_with_captions, job_id)
+    await enqueue_job(background_tasks, render_video_with_captions, job_id)
 
     return {"status": "success", "message": "Rendering started"}
 
@@ -756,39 +886,32 @@ async def websocket_status(websocket: WebSocket, job_id: str):
 
     Clients connect and receive status updates whenever the job state changes
     """
+    # Subscribe before reading the snapshot so no update can fall in between
     await manager.connect(websocket, job_id)
 
     try:
-        # Send current status immediately on connection
-        if job_id in jobs:
-            job = jobs[job_id]
-            await websocket.send_json({
-                "job_id": job.job_id,
-                "status": job.status,
-                "progress": job.progress,
-                "message": job.message,
-                "created_at": job.created_at.isoformat(),
-                "completed_at": job.completed_at.isoformat() if job.completed_at else None,
-                "download_url": f"/api/download/{job_id}" if job.status == JobStatus.COMPLETED else None
-            })
-        else:
-            await websocket.send_json({
+        job = await job_store.get(job_id)
+        if job is None:
+            # No relay running yet, so this is the only sender on the socket
+            await websocket.send_text(orjson.dumps({
                 "error": "Job not found",
                 "job_id": job_id
-            })
+            }).decode())
             await websocket.close()
             return
 
-        # Keep connection alive and wait for client disconnect
+        # Current status first, then any update that arrived while reading it
+        manager.start_relay(websocket, job_id, _status_payload(job))
+
+        # Wait for client disconnect. Dead peers are detected by uvicorn's
+        # protocol-level PING/PONG (ws_ping_interval/ws_ping_timeout), so no
+        # per-client timeout timer is needed here; text "ping" messages from
+        # the frontend are still answered for compatibility - through the relay,
+        # so it stays the only task writing to the socket.
         while True:
-            # Heartbeat mechanism: wait for ping from client
-            try:
-                data = await asyncio.wait_for(websocket.receive_text(), timeout=30.0)
-                if data == "ping":
-                    await websocket.send_text("pong")
-            except asyncio.TimeoutError:
-                # No ping received in 30 seconds, close connection
-                break
+            data = await websocket.receive_text()
+            if data == "ping":
+                manager.queue_text(websocket, job_id, "pong")
 
     except WebSocketDisconnect:
         pass
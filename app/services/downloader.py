@@ -1,10 +1,21 @@
 import yt_dlp
 import re
+import os
+import shutil
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple, Union
 import uuid
-from app.config import DOWNLOAD_DIR
-from app.models import VideoMetadata
+from app.config import DOWNLOAD_DIR, CACHE_DIR
+from app.models import YouTubeMetadata, YT_URL_RE
+
+
+# Multi-connection downloads for whole videos when aria2c is installed
+ARIA2C_AVAILABLE = shutil.which('aria2c') is not None
 
 
 class DownloaderError(Exception):
@@ -12,7 +23,7 @@ class DownloaderError(Exception):
     pass
 
 
-def extract_video_metadata(url: str) -> VideoMetadata:
+def extract_video_metadata(url: str) -> YouTubeMetadata:
     """
     Extract video metadata from YouTube URL without downloading.
 
@@ -20,7 +31,7 @@ def extract_video_metadata(url: str) -> VideoMetadata:
         url: YouTube video URL
 
     Returns:
-        VideoMetadata object with title, duration, dimensions, etc.
+        YouTubeMetadata object with title, duration, dimensions, etc.
 
     Raises:
         DownloaderError: If extraction fails
@@ -48,15 +59,14 @@ def extract_video_metadata(url: str) -> VideoMetadata:
                         height = fmt['height']
                         break
 
-            return VideoMetadata(
+            return YouTubeMetadata(
                 title=info.get('title', 'Untitled'),
                 duration=float(duration) if duration else 0.0,
                 width=width or 1920,
                 height=height or 1080,
                 thumbnail_url=info.get('thumbnail', ''),
                 embed_url=f"https://www.youtube.com/embed/{video_id}",
-                video_id=video_id,
-                source_type="youtube"
+                video_id=video_id
             )
 
     except yt_dlp.utils.DownloadError as e:
@@ -65,6 +75,75 @@ def extract_video_metadata(url: str) -> VideoMetadata:
         raise DownloaderError(f"Unexpected error extracting metadata: {str(e)}")
 
 
+# Metadata cache: video_id -> (expires_at, metadata), LRU-ordered
+METADATA_CACHE_SIZE = 512
+METADATA_CACHE_TTL = 600  # seconds
+_metadata_cache: "OrderedDict[str, Tuple[float, YouTubeMetadata]]" = OrderedDict()
+_metadata_cache_lock = threading.Lock()
+
+
+def extract_video_metadata_cached(url: str) -> YouTubeMetadata:
+    """
+    Same as extract_video_metadata, but cached per YouTube video ID.
+
+    watch?v=X, youtu.be/X and shorts/X links all share one cache entry.
+
+    Args:
+        url: YouTube video URL
+
+    Returns:
+        YouTubeMetadata object
+
+    Raises:
+        DownloaderError: If extraction fails
+    """
+    video_id = extract_youtube_video_id(url)
+    if video_id is None:
+        return extract_video_metadata(url)
+
+    now = time.monotonic()
+    with _metadata_cache_lock:
+        entry = _metadata_cache.get(video_id)
+        if entry is not None and entry[0] > now:
+            _metadata_cache.move_to_end(video_id)
+            return entry[1]
+
+    metadata = extract_video_metadata(url)
+
+    with _metadata_cache_lock:
+        _metadata_cache[video_id] = (now + METADATA_CACHE_TTL, metadata)
+        _metadata_cache.move_to_end(video_id)
+        while len(_metadata_cache) > METADATA_CACHE_SIZE:
+            _metadata_cache.popitem(last=False)
+
+    return metadata
+
+
+def invalidate_video_metadata(url: str) -> None:
+    """Drop the cached metadata for a URL (e.g. after its download failed)"""
+    video_id = extract_youtube_video_id(url)
+    if video_id is not None:
+        with _metadata_cache_lock:
+            _metadata_cache.pop(video_id, None)
+
+
+def _download_cache_path(url: str, start_time: Optional[float], end_time: Optional[float]) -> Path:
+    """Cache file for a URL + time range (keyed on the video ID when the URL has one)"""
+    source = extract_youtube_video_id(url) or url
+    key = hashlib.sha1(f"{source}|{start_time}|{end_time}".encode()).hexdigest()
+    return CACHE_DIR / f"{key}.mp4"
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    """Hard-link src to dst (falls back to a copy across filesystems)"""
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
 def download_youtube(
     url: str,
     job_id: Optional[str] = None,
@@ -91,19 +170,33 @@ def download_youtube(
 
     output_path = DOWNLOAD_DIR / f"{job_id}.mp4"
 
+    # Same URL + range downloaded recently: link the cached file instead of re-downloading.
+    # Jobs get their own hard link, so trimming/deleting a job's file leaves the cache intact.
+    cache_path = _download_cache_path(url, start_time, end_time)
+    if cache_path.exists():
+        try:
+            _link_or_copy(cache_path, output_path)
+            # Links share one inode: refresh its mtime so cleanup doesn't treat the new job's file as old
+            os.utime(output_path)
+            print(f"Using cached download: {cache_path.name}")
+            return str(output_path)
+        except OSError:
+            pass  # Evicted by cleanup in the meantime - download again
+
     # Output without extension - yt-dlp will add it
     output_template = DOWNLOAD_DIR / job_id
 
     ydl_opts = {
-        # Download best available quality (works with HLS/m3u8)
-        'format': 'bv*+ba/b',  # best video + best audio, or best combined
+        # Prefer native H.264 MP4 + M4A streams so the merge is a plain mux into mp4;
+        # fall back to best available quality (works with HLS/m3u8)
+        'format': 'bv*[ext=mp4][vcodec^=avc1]+ba[ext=m4a]/b[ext=mp4]/bv*+ba/b',
         'outtmpl': str(output_template),  # yt-dlp will add extension
         'quiet': False,
         'no_warnings': False,
         'merge_output_format': 'mp4',  # Force merge to mp4
         'postprocessors': [{
             'key': 'FFmpegVideoConvertor',
-            'preferedformat': 'mp4',  # Convert to mp4 if needed
+            'preferedformat': 'mp4',  # Only runs for non-mp4 fallbacks
         }],
     }
 
@@ -116,6 +209,13 @@ def download_youtube(
         ]
         ydl_opts['force_keyframes_at_cuts'] = True
         print(f"Downloading time range: {start_time}s to {end_time}s")
+    elif ARIA2C_AVAILABLE:
+        # Whole-video downloads: 16 connections instead of one throttled stream
+        # (range downloads go through FFmpeg, so aria2c wouldn't apply there)
+        ydl_opts['external_downloader'] = {'default': 'aria2c'}
+        ydl_opts['external_downloader_args'] = {
+            'aria2c': ['-x', '16', '-s', '16', '-k', '1M', '--summary-interval=0']
+        }
 
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
@@ -125,6 +225,15 @@ def download_youtube(
             # After download, the merged file should be at output_path
             if output_path.exists() and output_path.stat().st_size > 0:
                 print(f"Downloaded successfully: {output_path}")
+                # Caching is best-effort: a failed store must not fail the download
+                try:
+                    _link_or_copy(output_path, cache_path)
+                except OSError as e:
+                    print(f"Warning: Could not cache download {cache_path.name}: {e}")
+                    try:
+                        cache_path.unlink()  # Never leave a partial copy to be served as a hit
+                    except OSError:
+                        pass
                 return str(output_path)
             else:
                 # Check if file exists with requested_downloads
@@ -141,6 +250,37 @@ def download_youtube(
         raise DownloaderError(f"Unexpected error during download: {str(e)}")
 
 
+# Max parallel downloads in download_youtube_batch
+BATCH_DOWNLOAD_WORKERS = 4
+
+
+def download_youtube_batch(urls: List[str]) -> Dict[str, Union[str, DownloaderError]]:
+    """
+    Download several YouTube URLs in parallel (threads - the work is network I/O).
+
+    A failed URL doesn't abort the batch; its error is returned in place of a path.
+
+    Args:
+        urls: YouTube video URLs
+
+    Returns:
+        Dict of URL -> downloaded file path, or the DownloaderError it raised
+    """
+    results: Dict[str, Union[str, DownloaderError]] = {}
+
+    with ThreadPoolExecutor(max_workers=BATCH_DOWNLOAD_WORKERS) as executor:
+        futures = {executor.submit(download_youtube, url): url for url in dict.fromkeys(urls)}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                results[url] = future.result()
+            except DownloaderError as e:
+                print(f"Batch download failed for {url}: {e}")
+                results[url] = e
+
+    return results
+
+
 def validate_youtube_url(url: str) -> bool:
     """
     Validate if URL is a valid YouTube URL
@@ -151,11 +291,18 @@ def validate_youtube_url(url: str) -> bool:
     Returns:
         True if valid YouTube URL, False otherwise
     """
-    youtube_domains = [
-        'youtube.com',
-        'www.youtube.com',
-        'youtu.be',
-        'm.youtube.com'
-    ]
-
-    return any(domain in url.lower() for domain in youtube_domains)
+    return YT_URL_RE.match(url) is not None
+
+
+def extract_youtube_video_id(url: str) -> Optional[str]:
+    """
+    Extract the 11-character video ID from a YouTube URL
+
+    Args:
+        url: YouTube video URL
+
+    Returns:
+        Video ID, or None if the URL is not a recognised YouTube link
+    """
+    match = YT_URL_RE.match(url)
+    return match.group('video_id') if match else None
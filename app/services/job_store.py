@@ -0,0 +1,155 @@
+"""
+Job state storage.
+
+Jobs live in an in-process dict by default. Set REDIS_URL to keep them in
+Redis instead (one hash per job) so several uvicorn workers share state.
+
+Job objects returned by get() are snapshots - always persist changes with
+set() or update_fields() rather than mutating the returned object.
+
+With Redis, status updates are also published on a pub/sub channel so every
+API worker can relay them to its own WebSocket clients, whichever process
+(API worker or arq worker) ran the job.
+
+The store also remembers the auto-generated captions of recent uploads by
+content hash, so re-uploading an identical file skips transcription.
+"""
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional
+import orjson
+from pydantic import TypeAdapter
+from pydantic_core import to_jsonable_python
+from app.config import REDIS_URL, CLEANUP_AGE_HOURS
+from app.models import JobData, Caption, CAPTION_LIST_ADAPTER
+
+# Max number of upload hashes whose captions are kept by the in-memory store
+UPLOAD_CAPTIONS_CACHE_SIZE = 256
+
+# Redis pub/sub channel carrying job status payloads
+STATUS_CHANNEL = "job_status"
+
+
+class JobStore:
+    """In-memory job storage (single process)"""
+
+    # True if other processes see the same jobs (status updates must be published)
+    shared = False
+
+    def __init__(self):
+        self._jobs: Dict[str, JobData] = {}
+        self._captions_by_hash: OrderedDict[str, List[Caption]] = OrderedDict()
+
+    async def get(self, job_id: str) -> Optional[JobData]:
+        """Return the job, or None if it doesn't exist"""
+        return self._jobs.get(job_id)
+
+    async def set(self, job: JobData) -> None:
+        """Create or replace a job"""
+        self._jobs[job.job_id] = job
+
+    async def update_fields(self, job_id: str, **fields) -> Optional[JobData]:
+        """Update some fields of a job, returning the updated job (None if missing)"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        for name, value in fields.items():
+            setattr(job, name, value)
+        return job
+
+    async def delete(self, job_id: str) -> None:
+        """Remove a job (no-op if missing)"""
+        self._jobs.pop(job_id, None)
+
+    async def get_captions_for_hash(self, content_hash: str) -> Optional[List[Caption]]:
+        """Return the auto-generated captions of an upload with this content hash, if known"""
+        captions = self._captions_by_hash.get(content_hash)
+        if captions is None:
+            return None
+        self._captions_by_hash.move_to_end(content_hash)
+        return list(captions)
+
+    async def set_captions_for_hash(self, content_hash: str, captions: List[Caption]) -> None:
+        """Remember the auto-generated captions for an upload's content hash"""
+        self._captions_by_hash[content_hash] = list(captions)
+        self._captions_by_hash.move_to_end(content_hash)
+        while len(self._captions_by_hash) > UPLOAD_CAPTIONS_CACHE_SIZE:
+            self._captions_by_hash.popitem(last=False)
+
+
+class RedisJobStore(JobStore):
+    """Redis-backed job storage shared across workers (hash per job, JSON per field)"""
+
+    shared = True
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._adapter = TypeAdapter(JobData)
+        self._ttl = CLEANUP_AGE_HOURS * 3600
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"job:{job_id}"
+
+    @staticmethod
+    def _encode(fields: dict) -> dict:
+        return {name: orjson.dumps(to_jsonable_python(value)) for name, value in fields.items()}
+
+    def _decode(self, data: dict) -> Optional[JobData]:
+        if not data:
+            return None
+        return self._adapter.validate_python({name.decode(): orjson.loads(value) for name, value in data.items()})
+
+    async def get(self, job_id: str) -> Optional[JobData]:
+        return self._decode(await self._redis.hgetall(self._key(job_id)))
+
+    async def set(self, job: JobData) -> None:
+        key = self._key(job.job_id)
+        fields = self._adapter.dump_python(job, mode="json")
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping=self._encode(fields))
+            pipe.expire(key, self._ttl)
+            await pipe.execute()
+
+    async def update_fields(self, job_id: str, **fields) -> Optional[JobData]:
+        key = self._key(job_id)
+        if not await self._redis.exists(key):
+            return None
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=self._encode(fields))
+            pipe.hgetall(key)
+            _, data = await pipe.execute()
+        return self._decode(data)
+
+    async def delete(self, job_id: str) -> None:
+        await self._redis.delete(self._key(job_id))
+
+    async def get_captions_for_hash(self, content_hash: str) -> Optional[List[Caption]]:
+        data = await self._redis.get(f"upload:{content_hash}")
+        if data is None:
+            return None
+        return CAPTION_LIST_ADAPTER.validate_json(data)
+
+    async def set_captions_for_hash(self, content_hash: str, captions: List[Caption]) -> None:
+        await self._redis.set(f"upload:{content_hash}", CAPTION_LIST_ADAPTER.dump_json(captions), ex=self._ttl)
+
+    async def publish_status(self, status_data: dict) -> None:
+        """Publish a job status payload to every subscribed API worker"""
+        await self._redis.publish(STATUS_CHANNEL, orjson.dumps(status_data))
+
+    async def status_updates(self) -> AsyncIterator[dict]:
+        """Yield job status payloads published by any process"""
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(STATUS_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield orjson.loads(message["data"])
+        finally:
+            await pubsub.aclose()
+
+
+# Global job store instance
+job_store = RedisJobStore(REDIS_URL) if REDIS_URL else JobStore()
@@ -1,6 +1,10 @@
-from typing import List
+from typing import List, Optional
 from pathlib import Path
+from functools import lru_cache
+from collections import deque
+import os
 import subprocess
+import orjson
 from app.models import Caption, CropConfig
 from app.config import (
     OUTPUT_DIR,
@@ -16,7 +20,9 @@ from app.config import (
     FFMPEG_VIDEO_CODEC,
     FFMPEG_AUDIO_CODEC,
     FFMPEG_PRESET,
-    FFMPEG_CRF
+    FFMPEG_CRF,
+    FFMPEG_NVENC_CODEC,
+    FFMPEG_NVENC_PRESET
 )
 
 
@@ -25,6 +31,133 @@ class RendererError(Exception):
     pass
 
 
+# Only the last FFMPEG_STDERR_TAIL_CHUNKS * 4KB of FFmpeg's stderr are kept for error messages
+FFMPEG_STDERR_TAIL_CHUNKS = 16
+
+
+def _run_ffmpeg(command: List[str]) -> None:
+    """
+    Run an FFmpeg command, keeping only the tail of its stderr.
+
+    Long encodes can log megabytes of progress; draining stderr through a
+    small ring buffer bounds memory and can't fill the pipe.
+
+    Raises:
+        subprocess.CalledProcessError: On non-zero exit (stderr holds the decoded tail)
+    """
+    tail = deque(maxlen=FFMPEG_STDERR_TAIL_CHUNKS)
+    with subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE) as proc:
+        for chunk in iter(lambda: proc.stderr.read(4096), b''):
+            tail.append(chunk)
+        returncode = proc.wait()
+
+    if returncode:
+        raise subprocess.CalledProcessError(
+            returncode, command, stderr=b''.join(tail).decode('utf-8', 'replace')
+        )
+
+
+@lru_cache(maxsize=1)
+def _detect_encoder() -> str:
+    """
+    Pick the H.264 encoder once per process: NVENC if FFmpeg has it and a GPU
+    can actually open it, otherwise FFMPEG_VIDEO_CODEC.
+    """
+    try:
+        encoders = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-encoders'],
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout
+        if f" {FFMPEG_NVENC_CODEC} " not in encoders:
+            return FFMPEG_VIDEO_CODEC
+
+        # Builds often list NVENC without a usable GPU - encode a few test frames
+        subprocess.run(
+            [
+                'ffmpeg', '-hide_banner', '-f', 'lavfi', '-i', 'color=size=256x256:duration=0.1',
+                '-c:v', FFMPEG_NVENC_CODEC, '-f', 'null', '-'
+            ],
+            capture_output=True,
+            check=True
+        )
+        print(f"Using hardware encoder {FFMPEG_NVENC_CODEC}")
+        return FFMPEG_NVENC_CODEC
+    except Exception:
+        return FFMPEG_VIDEO_CODEC
+
+
+def _video_codec_args(preset: str) -> List[str]:
+    """
+    FFmpeg video encoder arguments for the detected encoder
+
+    Args:
+        preset: x264 preset used for the software encoder
+
+    Returns:
+        Arguments list (NVENC maps CRF to constant-quality -cq)
+    """
+    encoder = _detect_encoder()
+    if encoder == FFMPEG_NVENC_CODEC:
+        return [
+            '-c:v', encoder,
+            '-preset', FFMPEG_NVENC_PRESET,
+            '-tune', 'hq',
+            '-rc', 'vbr',
+            '-cq', str(FFMPEG_CRF),
+            '-b:v', '0'
+        ]
+    return ['-c:v', encoder, '-preset', preset, '-crf', str(FFMPEG_CRF)]
+
+
+def _probe_audio_codec(video_path: str) -> Optional[str]:
+    """Return the codec name of the first audio stream (None if none or probe fails)"""
+    try:
+        result = subprocess.run(
+            [
+                'ffprobe', '-v', 'error',
+                '-select_streams', 'a:0',
+                '-show_entries', 'stream=codec_name',
+                '-of', 'default=noprint_wrappers=1:nokey=1',
+                video_path
+            ],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        return result.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _audio_codec_args(video_path: str) -> List[str]:
+    """
+    FFmpeg audio arguments: stream-copy AAC audio (only video is re-encoded),
+    otherwise encode to AAC so the track is valid in MP4
+    """
+    if _probe_audio_codec(video_path) in (None, 'aac'):
+        return ['-c:a', FFMPEG_AUDIO_CODEC]
+    return ['-c:a', 'aac', '-b:a', '128k']
+
+
+def write_srt_file(captions: List[Caption], srt_path: Path) -> None:
+    """
+    Write captions as an SRT file with a single raw write (no text-layer wrapper)
+
+    Args:
+        captions: List of Caption objects
+        srt_path: Destination path
+    """
+    data = memoryview(Caption.render_srt(captions).encode('utf-8'))
+    fd = os.open(srt_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+
+
 def generate_srt_file(captions: List[Caption], job_id: str) -> str:
     """
     Generate SRT subtitle file from captions
@@ -38,10 +171,7 @@ def generate_srt_file(captions: List[Caption], job_id: str) -> str:
     """
     srt_path = TEMP_DIR / f"{job_id}.srt"
 
-    with open(srt_path, 'w', encoding='utf-8') as f:
-        for i, caption in enumerate(captions, start=1):
-            f.write(caption.to_srt_entry(i))
-            f.write('\n')  # Blank line between entries
+    write_srt_file(captions, srt_path)
 
     return str(srt_path)
 
@@ -90,10 +220,10 @@ def burn_captions(video_path: str, captions: List[Caption], job_id: str) -> str:
             'ffmpeg',
             '-i', video_path,
             '-vf', f"subtitles={srt_path}:force_style='{style}'",
-            '-c:v', FFMPEG_VIDEO_CODEC,
-            '-preset', FFMPEG_PRESET,
-            '-crf', str(FFMPEG_CRF),
-            '-c:a', FFMPEG_AUDIO_CODEC,
+            *_video_codec_args(FFMPEG_PRESET),
+            *_audio_codec_args(video_path),
+            '-pix_fmt', 'yuv420p',  # Broadest player compatibility
+            '-movflags', '+faststart',  # moov atom first so playback/seek starts immediately
             '-y',  # Overwrite output file
             str(output_path)
         ]
@@ -102,12 +232,7 @@ def burn_captions(video_path: str, captions: List[Caption], job_id: str) -> str:
         print(f"Command: {' '.join(command)}")
 
         # Run FFmpeg
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        _run_ffmpeg(command)
 
         if not output_path.exists():
             raise RendererError("Rendering completed but output file not found")
@@ -127,88 +252,182 @@ def burn_captions(video_path: str, captions: List[Caption], job_id: str) -> str:
         raise RendererError(f"Unexpected error during rendering: {str(e)}")
 
 
+@lru_cache(maxsize=64)
+def _video_info_cached(video_path: str, mtime_ns: int, size: int) -> dict:
+    """ffprobe a file; mtime/size are part of the cache key so rewritten files are re-probed"""
+    command = [
+        'ffprobe',
+        '-v', 'quiet',
+        '-print_format', 'json',
+        '-show_format',
+        '-show_streams',
+        video_path
+    ]
+
+    # Bytes output straight into orjson (no text-mode decode)
+    result = subprocess.run(
+        command,
+        capture_output=True,
+        check=True
+    )
+
+    return orjson.loads(result.stdout)
+
+
 def get_video_info(video_path: str) -> dict:
     """
-    Get video information using ffprobe
+    Get video information using ffprobe (cached per file version)
 
     Args:
         video_path: Path to video file
 
     Returns:
-        Dictionary with video info (duration, width, height, etc.)
+        Dictionary with video info (duration, width, height, etc.).
+        The dict is shared with the cache - don't mutate it.
     """
     try:
-        command = [
-            'ffprobe',
-            '-v', 'quiet',
-            '-print_format', 'json',
-            '-show_format',
-            '-show_streams',
-            video_path
-        ]
+        st = os.stat(video_path)
+        return _video_info_cached(video_path, st.st_mtime_ns, st.st_size)
+
+    except Exception as e:
+        print(f"Warning: Could not get video info: {e}")
+        return {}
+
+
+# Max difference between requested and actual duration for a stream-copied trim
+STREAM_COPY_TOLERANCE = 0.1  # seconds
+
 
+def _probe_duration(video_path: str) -> Optional[float]:
+    """Return the container duration in seconds (None if the probe fails)"""
+    try:
         result = subprocess.run(
-            command,
+            [
+                'ffprobe', '-v', 'error',
+                '-show_entries', 'format=duration',
+                '-of', 'default=noprint_wrappers=1:nokey=1',
+                video_path
+            ],
             capture_output=True,
             text=True,
             check=True
         )
+        return float(result.stdout.strip())
+    except Exception:
+        return None
 
-        import json
-        return json.loads(result.stdout)
 
-    except Exception as e:
-        print(f"Warning: Could not get video info: {e}")
-        return {}
+def _stream_copy_trim(video_path: str, start_time: float, duration: float, output_path: Path) -> bool:
+    """
+    Try to trim without re-encoding.
 
+    Stream copy can only cut on keyframes, so the result is kept only if its
+    duration is within STREAM_COPY_TOLERANCE of the requested one (i.e. the
+    start fell on or next to a keyframe).
 
-def trim_video(video_path: str, start_time: float, end_time: float, job_id: str) -> str:
+    Returns:
+        True if output_path holds an accurate trim, False if the caller must re-encode
     """
-    Trim video to specified time range using FFmpeg.
+    command = [
+        'ffmpeg',
+        '-ss', str(start_time),
+        '-i', video_path,
+        '-t', str(duration),
+        '-c', 'copy',
+        '-avoid_negative_ts', 'make_zero',
+        '-movflags', '+faststart',
+        '-y',
+        str(output_path)
+    ]
+    try:
+        _run_ffmpeg(command)
+        actual = _probe_duration(str(output_path))
+    except subprocess.CalledProcessError:
+        actual = None
+    if actual is not None and abs(actual - duration) <= STREAM_COPY_TOLERANCE:
+        return True
+
+    output_path.unlink(missing_ok=True)
+    return False
+
+
+def trim_and_crop_video(
+    video_path: str,
+    job_id: str,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+    crop_config: Optional[CropConfig] = None
+) -> str:
+    """
+    Trim and/or crop a video in a single FFmpeg pass (one decode + encode).
+
+    Trimming applies only if both start_time and end_time are given.
 
     Args:
         video_path: Path to input video
+        job_id: Job ID for naming output file
         start_time: Start time in seconds
         end_time: End time in seconds
-        job_id: Job ID for naming output file
+        crop_config: CropConfig with x, y, width, height
 
     Returns:
-        Path to trimmed video
+        Path to the processed video (the input path if there is nothing to do)
 
     Raises:
-        RendererError: If trimming fails
+        RendererError: If processing fails
     """
-    try:
-        output_path = TEMP_DIR / f"{job_id}_trimmed.mp4"
+    trim = start_time is not None and end_time is not None
+    if not trim and not crop_config:
+        return video_path
 
-        duration = end_time - start_time
-        print(f"Trimming video: {start_time}s to {end_time}s (duration: {duration}s)")
+    steps = []
+    if trim:
+        steps.append("trimmed")
+    if crop_config:
+        steps.append("cropped")
+    output_path = TEMP_DIR / f"{job_id}_{'_'.join(steps)}.mp4"
 
-        # FFmpeg trim: -ss for start, -t for duration
-        command = [
-            'ffmpeg',
-            '-ss', str(start_time),
-            '-i', video_path,
-            '-t', str(duration),
-            '-c:v', FFMPEG_VIDEO_CODEC,
-            '-preset', 'fast',
-            '-crf', str(FFMPEG_CRF),
-            '-c:a', 'aac',  # Re-encode audio to avoid sync issues
+    try:
+        # A plain trim of an MP4 can usually skip the x264 pass entirely
+        if trim and not crop_config and Path(video_path).suffix.lower() == '.mp4':
+            if _stream_copy_trim(video_path, start_time, end_time - start_time, output_path):
+                print(f"Video trimmed with stream copy: {output_path}")
+                Path(video_path).unlink(missing_ok=True)
+                return str(output_path)
+            print("Stream-copy trim not keyframe-accurate, re-encoding")
+
+        command = ['ffmpeg']
+
+        # FFmpeg trim: -ss for start (input seek), -t for duration
+        if trim:
+            duration = end_time - start_time
+            print(f"Trimming video: {start_time}s to {end_time}s (duration: {duration}s)")
+            command += ['-ss', str(start_time), '-i', video_path, '-t', str(duration)]
+        else:
+            command += ['-i', video_path]
+
+        # FFmpeg crop filter: crop=w:h:x:y
+        if crop_config:
+            x, y = crop_config.x, crop_config.y
+            w, h = crop_config.width, crop_config.height
+            print(f"Cropping video: {w}x{h} at ({x}, {y})")
+            command += ['-vf', f'crop={w}:{h}:{x}:{y}']
+
+        command += [
+            *_video_codec_args('fast'),
+            *_audio_codec_args(video_path),
+            '-pix_fmt', 'yuv420p',
+            '-movflags', '+faststart',  # Streamed by the editor preview
             '-y',
             str(output_path)
         ]
 
-        print(f"Trim command: {' '.join(command)}")
+        print(f"Trim/crop command: {' '.join(command)}")
 
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        _run_ffmpeg(command)
 
         if not output_path.exists():
-            raise RendererError("Trimming completed but output file not found")
+            raise RendererError("Trim/crop completed but output file not found")
 
         # Remove original file to save space
         try:
@@ -216,76 +435,47 @@ def trim_video(video_path: str, start_time: float, end_time: float, job_id: str)
         except:
             pass
 
-        print(f"Video trimmed successfully: {output_path}")
+        print(f"Video {' and '.join(steps)} successfully: {output_path}")
         return str(output_path)
 
     except subprocess.CalledProcessError as e:
-        raise RendererError(f"FFmpeg trimming failed: {e.stderr}")
+        raise RendererError(f"FFmpeg trim/crop failed: {e.stderr}")
     except Exception as e:
-        raise RendererError(f"Unexpected error during trimming: {str(e)}")
+        raise RendererError(f"Unexpected error during trim/crop: {str(e)}")
 
 
-def crop_video(video_path: str, crop_config: CropConfig, job_id: str) -> str:
+def trim_video(video_path: str, start_time: float, end_time: float, job_id: str) -> str:
     """
-    Crop video using FFmpeg.
+    Trim video to specified time range using FFmpeg.
 
     Args:
         video_path: Path to input video
-        crop_config: CropConfig with x, y, width, height
+        start_time: Start time in seconds
+        end_time: End time in seconds
         job_id: Job ID for naming output file
 
     Returns:
-        Path to cropped video
+        Path to trimmed video
 
     Raises:
-        RendererError: If cropping fails
+        RendererError: If trimming fails
     """
-    try:
-        output_path = TEMP_DIR / f"{job_id}_cropped.mp4"
+    return trim_and_crop_video(video_path, job_id, start_time=start_time, end_time=end_time)
 
-        # Calculate crop parameters
-        x = crop_config.x
-        y = crop_config.y
-        w = crop_config.width
-        h = crop_config.height
 
-        print(f"Cropping video: {w}x{h} at ({x}, {y})")
-
-        # FFmpeg crop filter: crop=w:h:x:y
-        command = [
-            'ffmpeg',
-            '-i', video_path,
-            '-vf', f'crop={w}:{h}:{x}:{y}',
-            '-c:v', FFMPEG_VIDEO_CODEC,
-            '-preset', 'fast',  # Use fast preset for quicker cropping
-            '-crf', str(FFMPEG_CRF),
-            '-c:a', 'copy',  # Copy audio without re-encoding
-            '-y',
-            str(output_path)
-        ]
-
-        print(f"Crop command: {' '.join(command)}")
-
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-
-        if not output_path.exists():
-            raise RendererError("Cropping completed but output file not found")
+def crop_video(video_path: str, crop_config: CropConfig, job_id: str) -> str:
+    """
+    Crop video using FFmpeg.
 
-        # Optionally remove original file to save space
-        try:
-            Path(video_path).unlink()
-        except:
-            pass
+    Args:
+        video_path: Path to input video
+        crop_config: CropConfig with x, y, width, height
+        job_id: Job ID for naming output file
 
-        print(f"Video cropped successfully: {output_path}")
-        return str(output_path)
+    Returns:
+        Path to cropped video
 
-    except subprocess.CalledProcessError as e:
-        raise RendererError(f"FFmpeg cropping failed: {e.stderr}")
-    except Exception as e:
-        raise RendererError(f"Unexpected error during cropping: {str(e)}")
+    Raises:
+        RendererError: If cropping fails
+    """
+    return trim_and_crop_video(video_path, job_id, crop_config=crop_config)
@@ -1,5 +1,5 @@
 from typing import List
-from app.models import WordTimestamp, Caption
+from app.models import WordTimestamp, Caption, CAPTION_LIST_ADAPTER
 from app.config import (
     CAPTION_MAX_WORDS_PER_LINE,
     CAPTION_MIN_WORDS_PER_LINE,
@@ -8,6 +8,11 @@ from app.config import (
     CAPTION_MIN_DURATION
 )
 
+# Punctuation that indicates sentence end - ALWAYS break here
+SENTENCE_END_CHARS = frozenset('.!?')
+# Punctuation that indicates pause - break if at good length
+PAUSE_CHARS = frozenset(',;:')
+
 
 def segment_captions(words: List[WordTimestamp]) -> List[Caption]:
     """
@@ -28,29 +33,29 @@ def segment_captions(words: List[WordTimestamp]) -> List[Caption]:
     if not words:
         return []
 
+    # Config values as locals for the per-word loop
     max_words = CAPTION_MAX_WORDS_PER_LINE  # 4 words max per caption
+    min_words = CAPTION_MIN_WORDS_PER_LINE
+    max_duration = CAPTION_MAX_DURATION
+    min_duration = CAPTION_MIN_DURATION
     captions = []
     current_words = []
-
-    # Punctuation that indicates sentence end - ALWAYS break here
-    sentence_end = {'.', '!', '?'}
-    # Punctuation that indicates pause - break if at good length
-    pause_punct = {',', ';', ':'}
+    word_total = len(words)
 
     for i, word in enumerate(words):
         current_words.append(word)
         word_count = len(current_words)
         duration = word.end - current_words[0].start if current_words else 0
-        word_text = word.word.rstrip()
+        last_char = word.word.rstrip()[-1:]  # '' for an empty word
 
         should_break = False
 
         # 1. ALWAYS break on sentence end - one sentence per segment
-        if any(word_text.endswith(p) for p in sentence_end):
+        if last_char in SENTENCE_END_CHARS:
             should_break = True
 
         # 2. Force break if max duration exceeded
-        elif duration >= CAPTION_MAX_DURATION:
+        elif duration >= max_duration:
             should_break = True
 
         # 3. Force break if max words exceeded
@@ -58,47 +63,44 @@ def segment_captions(words: List[WordTimestamp]) -> List[Caption]:
             should_break = True
 
         # 4. Break on pause punctuation at good length
-        elif word_count >= CAPTION_MIN_WORDS_PER_LINE and duration >= CAPTION_MIN_DURATION:
-            if any(word_text.endswith(p) for p in pause_punct):
+        elif word_count >= min_words and duration >= min_duration:
+            if last_char in PAUSE_CHARS:
                 should_break = True
 
         # 5. Break on speech gap (>300ms pause to next word)
-        if not should_break and word_count >= CAPTION_MIN_WORDS_PER_LINE:
-            if i + 1 < len(words):
+        if not should_break and word_count >= min_words:
+            if i + 1 < word_total:
                 gap = words[i + 1].start - word.end
                 if gap > 0.3:  # 300ms pause indicates natural break
                     should_break = True
 
         if should_break and current_words:
-            caption = create_caption_from_words(current_words)
-            captions.append(caption)
+            captions.append(caption_dict_from_words(current_words))
             current_words = []
 
     # Add remaining words as final caption
     if current_words:
-        caption = create_caption_from_words(current_words)
-        captions.append(caption)
+        captions.append(caption_dict_from_words(current_words))
 
-    # Post-process: format captions (single line mode)
-    return [format_single_line(cap) for cap in captions]
+    # Validate all captions in a single batch, then format (single line mode)
+    return [format_single_line(cap) for cap in CAPTION_LIST_ADAPTER.validate_python(captions)]
 
 
-def create_caption_from_words(words: List[WordTimestamp]) -> Caption:
+def caption_dict_from_words(words: List[WordTimestamp]) -> dict:
     """
-    Create a Caption object from a list of words.
+    Build raw caption data from a list of words (validated later in batch).
 
     Args:
         words: List of WordTimestamp objects
 
     Returns:
-        Caption object with text and timing
+        Dict with text, start and end keys
     """
-    text = ' '.join(w.word for w in words)
-    return Caption(
-        text=text,
-        start=words[0].start,
-        end=words[-1].end
-    )
+    return {
+        'text': ' '.join(w.word for w in words),
+        'start': words[0].start,
+        'end': words[-1].end
+    }
 
 
 def format_single_line(caption: Caption) -> Caption:
@@ -0,0 +1,67 @@
+"""
+Background job dispatch.
+
+By default jobs run inside the API process via FastAPI BackgroundTasks. Set
+TASK_QUEUE=arq (requires REDIS_URL) to enqueue them on Redis instead, where
+they are picked up by separate worker processes:
+
+    arq app.worker.WorkerSettings
+
+Workers must see the same UPLOAD_DIR/TEMP_DIR/OUTPUT_DIR as the API.
+"""
+from typing import Callable, Optional
+from fastapi import BackgroundTasks
+from app.config import TASK_QUEUE, REDIS_URL
+
+
+class TaskQueueError(Exception):
+    """Custom exception for task queue errors"""
+    pass
+
+
+# arq Redis pool (None = run jobs with BackgroundTasks)
+_pool = None
+
+
+def arq_redis_settings():
+    from arq.connections import RedisSettings
+
+    return RedisSettings.from_dsn(REDIS_URL)
+
+
+async def init_task_queue() -> None:
+    """Connect to the arq queue if TASK_QUEUE=arq (called from the app lifespan)"""
+    global _pool
+
+    if TASK_QUEUE != "arq":
+        return
+    if not REDIS_URL:
+        raise TaskQueueError("TASK_QUEUE=arq requires REDIS_URL to be set")
+
+    from arq import create_pool
+
+    _pool = await create_pool(arq_redis_settings())
+
+
+async def close_task_queue() -> None:
+    """Close the arq connection pool, if any"""
+    global _pool
+
+    if _pool is not None:
+        await _pool.aclose()
+        _pool = None
+
+
+async def enqueue_job(background_tasks: Optional[BackgroundTasks], func: Callable, *args) -> None:
+    """
+    Run a job function in the background
+
+    Args:
+        background_tasks: Request's BackgroundTasks (used when no queue is configured)
+        func: Top-level job coroutine function; its name must be registered in app.worker
+        *args: Picklable positional arguments
+    """
+    if _pool is None:
+        background_tasks.add_task(func, *args)
+    else:
+        await _pool.enqueue_job(func.__name__, *args)
@@ -1,12 +1,24 @@
 from typing import List
 import subprocess
 import re
+import os
+import hashlib
+import logging
+import threading
 from pathlib import Path
 from app.config import (
-    WHISPER_MODEL, WHISPER_DEVICE, WHISPER_COMPUTE_TYPE, TEMP_DIR,
-    BAD_WORD_FILTER_ENABLED, BAD_WORDS, TRANSCRIPTION_PROVIDER
+    WHISPER_MODEL, WHISPER_DEVICE, WHISPER_COMPUTE_TYPE, WHISPER_BEAM_SIZE, TEMP_DIR, CACHE_DIR,
+    BAD_WORD_FILTER_ENABLED, BAD_WORDS, TRANSCRIPTION_PROVIDER, REPLICATE_WHISPER_MODEL
 )
-from app.models import WordTimestamp
+from app.models import WordTimestamp, WORD_LIST_ADAPTER
+
+logger = logging.getLogger(__name__)
+
+# A word (letters/digits/apostrophes) plus one directly following punctuation mark
+_SEG_TOKEN_RE = re.compile(r"(?:[^\W_]|')+[.,!?;:]?")
+
+# Splits a word into its base and trailing punctuation
+_WORD_PUNCT_RE = re.compile(r"^(.*?)([.,!?;:]*)$")
 
 
 def censor_word(word: str) -> str:
@@ -22,20 +34,15 @@ def censor_word(word: str) -> str:
     if not BAD_WORD_FILTER_ENABLED:
         return word
 
-    # Extract trailing punctuation
-    punct = ""
-    base_word = word
-    while base_word and base_word[-1] in '.,!?;:':
-        punct = base_word[-1] + punct
-        base_word = base_word[:-1]
+    # Split off trailing punctuation
+    base_word, punct = _WORD_PUNCT_RE.match(word).groups()
 
-    # Check if base word (lowercase) is in bad words list
+    # O(1) lookup per word (BAD_WORDS is all lowercase); BAD_WORDS_RE is for free text
     if base_word.lower() in BAD_WORDS:
         if len(base_word) <= 1:
             return "*" + punct
         # Keep first letter, replace rest with *
-        censored = base_word[0] + "*" * (len(base_word) - 1)
-        return censored + punct
+        return base_word[0] + "*" * (len(base_word) - 1) + punct
 
     return word
 
@@ -47,6 +54,7 @@ class TranscriberError(Exception):
 
 # Global model instance (loaded once, only for local provider)
 _model = None
+_model_lock = threading.Lock()
 
 
 def get_whisper_model():
@@ -59,17 +67,39 @@ def get_whisper_model():
     """
     global _model
     if _model is None:
-        from faster_whisper import WhisperModel
-        print(f"Loading Whisper model: {WHISPER_MODEL} on {WHISPER_DEVICE}")
-        _model = WhisperModel(
-            WHISPER_MODEL,
-            device=WHISPER_DEVICE,
-            compute_type=WHISPER_COMPUTE_TYPE
-        )
-        print("Whisper model loaded successfully")
+        # Double-checked: concurrent jobs must not each load a copy of the model
+        with _model_lock:
+            if _model is None:
+                # Imported lazily so the replicate provider doesn't need faster-whisper installed
+                from faster_whisper import WhisperModel
+                print(f"Loading Whisper model: {WHISPER_MODEL} on {WHISPER_DEVICE}")
+                _model = WhisperModel(
+                    WHISPER_MODEL,
+                    device=WHISPER_DEVICE,
+                    compute_type=WHISPER_COMPUTE_TYPE
+                )
+                print("Whisper model loaded successfully")
     return _model
 
 
+def warm_whisper_model() -> bool:
+    """
+    Load the local Whisper model ahead of the first job
+
+    Returns:
+        True if the model was loaded; False for other providers (nothing to load)
+        or if loading failed (the first job retries and reports the error)
+    """
+    if TRANSCRIPTION_PROVIDER != "local":
+        return False
+    try:
+        get_whisper_model()
+    except Exception as e:
+        logger.warning("Could not preload Whisper model: %s", e)
+        return False
+    return True
+
+
 def extract_audio(video_path: str) -> str:
     """
     Extract audio from video file using FFmpeg
@@ -78,21 +108,28 @@ def extract_audio(video_path: str) -> str:
         video_path: Path to video file
 
     Returns:
-        Path to extracted audio file (WAV format)
+        Path to extracted audio file (WAV for local Whisper, Opus/Ogg for Replicate)
 
     Raises:
         TranscriberError: If audio extraction fails
     """
     video_file = Path(video_path)
-    audio_path = TEMP_DIR / f"{video_file.stem}_audio.wav"
 
-    try:
+    if TRANSCRIPTION_PROVIDER == "replicate":
+        # Replicate is limited by upload bandwidth: 24 kbps Opus is ~10x smaller than PCM
+        audio_path = TEMP_DIR / f"{video_file.stem}_audio.ogg"
+        codec_args = ['-c:a', 'libopus', '-b:a', '24k', '-application', 'voip']
+    else:
         # Extract audio as WAV (Whisper works best with WAV)
+        audio_path = TEMP_DIR / f"{video_file.stem}_audio.wav"
+        codec_args = ['-acodec', 'pcm_s16le']  # PCM 16-bit
+
+    try:
         command = [
             'ffmpeg',
             '-i', str(video_path),
             '-vn',  # No video
-            '-acodec', 'pcm_s16le',  # PCM 16-bit
+            *codec_args,
             '-ar', '16000',  # 16kHz sample rate (Whisper's native rate)
             '-ac', '1',  # Mono
             '-y',  # Overwrite output file
@@ -117,6 +154,72 @@ def extract_audio(video_path: str) -> str:
         raise TranscriberError(f"Unexpected error during audio extraction: {str(e)}")
 
 
+def extract_audio_pcm(video_path: str) -> bytes:
+    """
+    Decode the audio track straight into memory as 16kHz mono s16le PCM
+
+    Args:
+        video_path: Path to video file
+
+    Returns:
+        Raw PCM bytes (no temp file is written)
+
+    Raises:
+        TranscriberError: If audio extraction fails
+    """
+    try:
+        command = [
+            'ffmpeg',
+            '-loglevel', 'error',
+            '-i', str(video_path),
+            '-vn',  # No video
+            '-f', 's16le',  # Raw samples, no container
+            '-acodec', 'pcm_s16le',
+            '-ar', '16000',  # 16kHz sample rate (Whisper's native rate)
+            '-ac', '1',  # Mono
+            '-'
+        ]
+
+        result = subprocess.run(
+            command,
+            capture_output=True,
+            check=True
+        )
+        return result.stdout
+
+    except subprocess.CalledProcessError as e:
+        raise TranscriberError(f"FFmpeg audio extraction failed: {e.stderr.decode(errors='replace')}")
+    except Exception as e:
+        raise TranscriberError(f"Unexpected error during audio extraction: {str(e)}")
+
+
+def _transcript_cache_path(audio: bytes) -> Path:
+    """
+    Cache file for the transcript of some extracted audio
+
+    The key hashes the extracted audio itself plus every setting that changes the
+    output (provider/model/decoding, bad word filter), so identical audio
+    (re-uploads, re-processed downloads) maps to the same transcript.
+    """
+    if TRANSCRIPTION_PROVIDER == "replicate":
+        model = REPLICATE_WHISPER_MODEL
+    else:
+        model = f"{WHISPER_MODEL}|compute={WHISPER_COMPUTE_TYPE}|beam={WHISPER_BEAM_SIZE}"
+    hasher = hashlib.blake2b(
+        f"{TRANSCRIPTION_PROVIDER}|{model}|censor={BAD_WORD_FILTER_ENABLED}|".encode(), digest_size=20
+    )
+    hasher.update(audio)
+    return CACHE_DIR / f"transcript_{hasher.hexdigest()}.json"
+
+
+def _save_transcript(cache_path: Path, words: List[WordTimestamp]) -> None:
+    """Write a transcript cache file atomically (concurrent jobs may share a key)"""
+    # Unique per process and thread: jobs transcribe on pool threads of one process
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(WORD_LIST_ADAPTER.dump_json(words))
+    os.replace(tmp_path, cache_path)
+
+
 def transcribe_audio(video_path: str) -> List[WordTimestamp]:
     """
     Transcribe audio from video with word-level timestamps.
@@ -135,21 +238,39 @@ def transcribe_audio(video_path: str) -> List[WordTimestamp]:
     try:
         # Extract audio first (needed for both providers)
         print("Extracting audio from video...")
-        audio_path = extract_audio(video_path)
-
-        # Choose transcription provider
         if TRANSCRIPTION_PROVIDER == "replicate":
-            words = _transcribe_with_replicate(audio_path)
+            # Replicate needs a file to upload
+            audio_path = extract_audio(video_path)
+            audio = Path(audio_path).read_bytes()
         else:
-            words = _transcribe_with_local(audio_path)
+            # Local Whisper takes the samples directly - no temp WAV written and re-decoded
+            audio_path = None
+            audio = extract_audio_pcm(video_path)
+
+        cache_path = _transcript_cache_path(audio)
+        if cache_path.exists():
+            words = WORD_LIST_ADAPTER.validate_json(cache_path.read_bytes())
+            print(f"Using cached transcript ({len(words)} words)")
+        else:
+            # Choose transcription provider
+            if TRANSCRIPTION_PROVIDER == "replicate":
+                words = _transcribe_with_replicate(audio_path)
+            else:
+                import numpy as np
+                samples = np.frombuffer(audio, np.int16).astype(np.float32) / 32768.0
+                words = _transcribe_with_local(samples)
+
+            print(f"Transcribed {len(words)} words using {TRANSCRIPTION_PROVIDER} provider")
 
-        print(f"Transcribed {len(words)} words using {TRANSCRIPTION_PROVIDER} provider")
+            if words:
+                _save_transcript(cache_path, words)
 
         # Clean up audio file
-        try:
-            Path(audio_path).unlink()
-        except:
-            pass
+        if audio_path:
+            try:
+                Path(audio_path).unlink()
+            except:
+                pass
 
         return words
 
@@ -179,9 +300,12 @@ def _transcribe_with_replicate(audio_path: str) -> List[WordTimestamp]:
         raise TranscriberError(str(e))
 
 
-def _transcribe_with_local(audio_path: str) -> List[WordTimestamp]:
+def _transcribe_with_local(audio) -> List[WordTimestamp]:
     """
     Transcribe using local faster-whisper model.
+
+    Args:
+        audio: Audio file path, or 16kHz mono float32 samples (numpy array)
     """
     print(f"Using local Whisper model for transcription...")
 
@@ -191,46 +315,36 @@ def _transcribe_with_local(audio_path: str) -> List[WordTimestamp]:
     # Transcribe with word timestamps
     print("Transcribing audio...")
     segments, info = model.transcribe(
-        audio_path,
+        audio,
         word_timestamps=True,
         language=None,  # Auto-detect language
         vad_filter=True,  # Voice activity detection
+        beam_size=WHISPER_BEAM_SIZE,
+        best_of=1,
+        temperature=0.0,  # No temperature-fallback re-decodes
+        condition_on_previous_text=False,  # Keeps prompts short and avoids repetition loops
     )
 
     print(f"Detected language: {info.language} (probability: {info.language_probability:.2f})")
 
     # Extract word-level timestamps with punctuation from segment text
     words = []
+    debug = logger.isEnabledFor(logging.DEBUG)
     for segment in segments:
         if hasattr(segment, 'words') and segment.words:
             # Get the full segment text (has punctuation)
             segment_text = segment.text.strip()
 
-            # Debug: print segment info
-            print(f"\n[DEBUG] Segment text: {segment_text}")
-
-            # Build a mapping: for each word position, find punctuation that follows it
-            # We'll parse the segment text to extract words with their trailing punctuation
-            segment_words_with_punct = []
-            current_word = ""
-            for char in segment_text:
-                if char.isalnum() or char == "'":  # Part of a word (including apostrophes)
-                    current_word += char
-                elif current_word:  # End of word, char might be punctuation or space
-                    if char in '.,!?;:':
-                        segment_words_with_punct.append(current_word + char)
-                    else:
-                        segment_words_with_punct.append(current_word)
-                    current_word = ""
-            # Don't forget the last word
-            if current_word:
-                segment_words_with_punct.append(current_word)
-
-            print(f"[DEBUG] Parsed words with punct: {segment_words_with_punct}")
+            # Split the segment text into words with their trailing punctuation
+            segment_words_with_punct = _SEG_TOKEN_RE.findall(segment_text)
 
             # Match with word timestamps
             word_objs = list(segment.words)
-            print(f"[DEBUG] Whisper word objs: {[w.word.strip() for w in word_objs]}")
+
+            if debug:
+                logger.debug("Segment text: %s", segment_text)
+                logger.debug("Parsed words with punct: %s", segment_words_with_punct)
+                logger.debug("Whisper word objs: %s", [w.word.strip() for w in word_objs])
 
             for i, word_obj in enumerate(word_objs):
                 word_text = word_obj.word.strip()
@@ -252,6 +366,7 @@ def _transcribe_with_local(audio_path: str) -> List[WordTimestamp]:
                     end=word_obj.end
                 ))
 
-            print(f"[DEBUG] Final words: {[w.word for w in words[-len(word_objs):]]}")
+            if debug:
+                logger.debug("Final words: %s", [w.word for w in words[-len(word_objs):]])
 
     return words
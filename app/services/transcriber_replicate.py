@@ -4,7 +4,6 @@ Used in production to offload GPU-intensive transcription to cloud.
 """
 import replicate
 import tempfile
-import os
 from typing import List
 from pathlib import Path
 from app.config import REPLICATE_API_TOKEN, REPLICATE_WHISPER_MODEL, TEMP_DIR
@@ -21,7 +20,7 @@ def transcribe_with_replicate(audio_path: str) -> List[WordTimestamp]:
     Transcribe audio using Replicate's incredibly-fast-whisper API.
 
     Args:
-        audio_path: Path to audio file (WAV format)
+        audio_path: Path to audio file (any FFmpeg-decodable format, normally Opus/Ogg)
 
     Returns:
         List of WordTimestamp objects
@@ -34,8 +33,8 @@ def transcribe_with_replicate(audio_path: str) -> List[WordTimestamp]:
             "REPLICATE_API_TOKEN not set. Please set the environment variable."
         )
 
-    # Set API token
-    os.environ["REPLICATE_API_TOKEN"] = REPLICATE_API_TOKEN
+    # Pass the token to the client directly instead of mutating os.environ
+    client = replicate.Client(api_token=REPLICATE_API_TOKEN)
 
     try:
         print(f"Uploading audio to Replicate...")
@@ -44,13 +43,13 @@ def transcribe_with_replicate(audio_path: str) -> List[WordTimestamp]:
         with open(audio_path, "rb") as audio_file:
             # Run the model
             print(f"Running Replicate Whisper model: {REPLICATE_WHISPER_MODEL}")
-            output = replicate.run(
+            output = client.run(
                 REPLICATE_WHISPER_MODEL,
                 input={
                     "audio": audio_file,
                     "task": "transcribe",
                     "timestamp": "word",  # Get word-level timestamps
-                    "batch_size": 64,
+                    "batch_size": 128,
                 }
             )
 
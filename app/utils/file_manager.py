@@ -1,9 +1,110 @@
 from pathlib import Path
-from datetime import datetime, timedelta
-from typing import List
-from app.config import TEMP_DIR, UPLOAD_DIR, DOWNLOAD_DIR, OUTPUT_DIR, CLEANUP_AGE_HOURS
+import logging
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Set, Tuple
+from app.config import TEMP_DIR, UPLOAD_DIR, DOWNLOAD_DIR, OUTPUT_DIR, CACHE_DIR, CLEANUP_AGE_HOURS, REDIS_URL, TASK_QUEUE
 import shutil
 
+logger = logging.getLogger(__name__)
+
+
+# Scan and unlink relative to an open directory fd (unlinkat: no path walk per file)
+_DIR_FD_SUPPORTED = os.scandir in os.supports_fd and os.unlink in os.supports_dir_fd
+
+
+def _cleanup_dir(directory: Path, cutoff_ts: float) -> Tuple[int, int]:
+    """
+    Delete files in one directory with mtime before cutoff_ts
+
+    Expired names are collected during the scan and removed afterwards in one
+    batch, relative to the directory's fd where the platform supports it.
+
+    Returns:
+        (number of files deleted, total size in bytes of the files left)
+    """
+    if not directory.exists():
+        return 0, 0
+
+    dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY) if _DIR_FD_SUPPORTED else None
+    try:
+        expired = []
+        remaining_size = 0
+
+        # scandir entries carry the file type from the directory read (no extra stat for is_file)
+        with os.scandir(directory if dir_fd is None else dir_fd) as it:
+            for entry in it:
+                if entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    # Compare raw epoch seconds (no datetime objects per file)
+                    if st.st_mtime < cutoff_ts:
+                        expired.append((entry.name, st.st_size))
+                    else:
+                        remaining_size += st.st_size
+
+        deleted_count = 0
+        for name, size in expired:
+            try:
+                if dir_fd is None:
+                    os.unlink(os.path.join(directory, name))
+                else:
+                    os.unlink(name, dir_fd=dir_fd)
+                deleted_count += 1
+                logger.debug("Deleted old file: %s", name)
+            except FileNotFoundError:
+                pass  # Removed by its job since the scan
+            except Exception as e:
+                logger.warning("Error deleting %s: %s", os.path.join(directory, name), e)
+                remaining_size += size
+    finally:
+        if dir_fd is not None:
+            os.close(dir_fd)
+
+    return deleted_count, remaining_size
+
+
+# Directories swept by the cleanup, keyed by the name used in size reports
+_CLEANUP_DIRS = {
+    'upload': UPLOAD_DIR,
+    'download': DOWNLOAD_DIR,
+    'output': OUTPUT_DIR,
+    'temp': TEMP_DIR,
+    'cache': CACHE_DIR,
+}
+
+
+def cleanup_and_report(age_hours: int = CLEANUP_AGE_HOURS) -> dict:
+    """
+    Delete old files and measure what's left in the same directory pass
+
+    Directories are scanned in parallel threads so their stat/unlink I/O overlaps.
+
+    Args:
+        age_hours: Age in hours after which files should be deleted
+
+    Returns:
+        {'deleted': number of files deleted, 'sizes': bytes left per directory
+        (files directly in it) plus 'total'}
+    """
+    cutoff_ts = time.time() - age_hours * 3600.0
+
+    names = list(_CLEANUP_DIRS)
+    directories = list(_CLEANUP_DIRS.values())
+
+    with ThreadPoolExecutor(max_workers=len(directories)) as executor:
+        results = list(executor.map(_cleanup_dir, directories, [cutoff_ts] * len(directories)))
+
+    _prune_job_files_index()
+
+    deleted_count = sum(deleted for deleted, _ in results)
+    sizes = {name: size for name, (_, size) in zip(names, results)}
+    sizes['total'] = sum(sizes.values())
+
+    logger.info("Cleanup completed: %d files deleted, %s left", deleted_count, format_size(sizes['total']))
+    return {'deleted': deleted_count, 'sizes': sizes}
+
 
 def cleanup_old_files(age_hours: int = CLEANUP_AGE_HOURS):
     """
@@ -12,44 +113,68 @@ def cleanup_old_files(age_hours: int = CLEANUP_AGE_HOURS):
     Args:
         age_hours: Age in hours after which files should be deleted
     """
-    cutoff_time = datetime.now() - timedelta(hours=age_hours)
+    return cleanup_and_report(age_hours)['deleted']
 
-    directories = [UPLOAD_DIR, DOWNLOAD_DIR, OUTPUT_DIR, TEMP_DIR]
-    deleted_count = 0
 
-    for directory in directories:
-        if not directory.exists():
-            continue
+# job_id -> files this process created for the job (see register_job_file)
+_job_files: Dict[str, Set[str]] = defaultdict(set)
 
-        for file_path in directory.iterdir():
-            if file_path.is_file():
-                # Get file modification time
-                file_mtime = datetime.fromtimestamp(file_path.stat().st_mtime)
+# Jobs may run in another process (arq worker, or another uvicorn worker sharing
+# the Redis job store), whose files never reach this process's index
+_JOBS_MAY_RUN_ELSEWHERE = TASK_QUEUE == "arq" or bool(REDIS_URL)
 
-                if file_mtime < cutoff_time:
-                    try:
-                        file_path.unlink()
-                        deleted_count += 1
-                        print(f"Deleted old file: {file_path.name}")
-                    except Exception as e:
-                        print(f"Error deleting {file_path}: {e}")
 
-    print(f"Cleanup completed: {deleted_count} files deleted")
-    return deleted_count
+def register_job_file(job_id: str, path) -> None:
+    """
+    Record a file created for a job so delete_job_files can remove it without scanning
+
+    Args:
+        job_id: Job ID
+        path: Path of the created file
+    """
+    _job_files[job_id].add(str(path))
+
+
+def _prune_job_files_index() -> None:
+    """Forget jobs whose registered files are all gone (expired by cleanup, never downloaded)"""
+    for job_id in list(_job_files):
+        paths = _job_files.get(job_id)
+        if paths is not None and not any(os.path.exists(path) for path in list(paths)):
+            _job_files.pop(job_id, None)
 
 
 def delete_job_files(job_id: str):
     """
     Delete all files associated with a job
 
+    Removes the files registered for the job in this process. The temp dirs are
+    also scanned for the job's files when this process has none registered, or
+    when parts of the job may have run in another process (arq, shared store).
+
     Args:
         job_id: Job ID
     """
-    patterns = [
-        f"{job_id}*",
-        f"*{job_id}*"
-    ]
+    paths = _job_files.pop(job_id, None)
+
+    deleted_files = []
+    for path in paths or ():
+        try:
+            os.unlink(path)
+            deleted_files.append(path)
+            logger.debug("Deleted job file: %s", os.path.basename(path))
+        except FileNotFoundError:
+            pass  # Intermediate file already removed by the pipeline
+        except Exception as e:
+            logger.warning("Error deleting %s: %s", path, e)
+
+    if paths is None or _JOBS_MAY_RUN_ELSEWHERE:
+        deleted_files.extend(_scan_delete_job_files(job_id))
 
+    return deleted_files
+
+
+def _scan_delete_job_files(job_id: str) -> List[str]:
+    """Delete a job's files by scanning every temp directory for its ID"""
     directories = [UPLOAD_DIR, DOWNLOAD_DIR, OUTPUT_DIR, TEMP_DIR]
     deleted_files = []
 
@@ -57,18 +182,58 @@ def delete_job_files(job_id: str):
         if not directory.exists():
             continue
 
-        for file_path in directory.iterdir():
-            if file_path.is_file() and job_id in file_path.name:
-                try:
-                    file_path.unlink()
-                    deleted_files.append(str(file_path))
-                    print(f"Deleted job file: {file_path.name}")
-                except Exception as e:
-                    print(f"Error deleting {file_path}: {e}")
+        with os.scandir(directory) as it:
+            for entry in it:
+                # Every job file is named "{job_id}..." (uploads, downloads, renders, SRTs, audio)
+                if entry.name.startswith(job_id) and entry.is_file(follow_symlinks=False):
+                    try:
+                        os.unlink(entry.path)
+                        deleted_files.append(entry.path)
+                        logger.debug("Deleted job file: %s", entry.name)
+                    except Exception as e:
+                        logger.warning("Error deleting %s: %s", entry.path, e)
 
     return deleted_files
 
 
+# directory -> (st_mtime_ns, total size of the files directly in it, subdirectories)
+_size_cache: Dict[str, Tuple[int, int, Tuple[str, ...]]] = {}
+
+
+def _dir_size(directory) -> int:
+    """
+    Total size of all files under a directory (recursive scandir walk)
+
+    Each directory's own file total is cached against its mtime, which changes
+    whenever an entry is added, removed or renamed, so an unchanged tree costs
+    one stat per directory. Files growing in place (e.g. an FFmpeg output still
+    being written) don't bump the mtime and are counted at their last scanned size.
+    """
+    path = os.fspath(directory)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        _size_cache.pop(path, None)
+        return 0
+
+    cached = _size_cache.get(path)
+    if cached is not None and cached[0] == mtime_ns:
+        _, files_size, subdirs = cached
+    else:
+        files_size = 0
+        found_subdirs = []
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_file(follow_symlinks=False):
+                    files_size += entry.stat(follow_symlinks=False).st_size
+                elif entry.is_dir(follow_symlinks=False):
+                    found_subdirs.append(entry.path)
+        subdirs = tuple(found_subdirs)
+        _size_cache[path] = (mtime_ns, files_size, subdirs)
+
+    return files_size + sum(_dir_size(subdir) for subdir in subdirs)
+
+
 def get_temp_dir_size() -> dict:
     """
     Get size of all temp directories
@@ -90,27 +255,38 @@ def get_temp_dir_size() -> dict:
             sizes[name] = 0
             continue
 
-        total_size = 0
-        for file_path in directory.rglob('*'):
-            if file_path.is_file():
-                total_size += file_path.stat().st_size
-
-        sizes[name] = total_size
+        sizes[name] = _dir_size(directory)
 
     sizes['total'] = sum(sizes.values())
     return sizes
 
 
+# Directories already created/verified by this process
+_verified_dirs: Set[str] = set()
+
+
 def ensure_directories_exist():
     """
     Ensure all required directories exist
+
+    Directories verified once are skipped on later calls (no syscalls).
     """
-    directories = [TEMP_DIR, UPLOAD_DIR, DOWNLOAD_DIR, OUTPUT_DIR]
+    directories = [TEMP_DIR, UPLOAD_DIR, DOWNLOAD_DIR, OUTPUT_DIR, CACHE_DIR]
 
+    created = False
     for directory in directories:
-        directory.mkdir(parents=True, exist_ok=True)
+        path = os.fspath(directory)
+        if path in _verified_dirs:
+            continue
+        os.makedirs(path, exist_ok=True)
+        _verified_dirs.add(path)
+        created = True
+
+    if created:
+        logger.info("All required directories verified")
+
 
-    print("All required directories verified")
+SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
 
 
 def format_size(bytes_size: int) -> str:
@@ -123,8 +299,6 @@ def format_size(bytes_size: int) -> str:
     Returns:
         Formatted string (e.g., "1.5 MB")
     """
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if bytes_size < 1024.0:
-            return f"{bytes_size:.2f} {unit}"
-        bytes_size /= 1024.0
-    return f"{bytes_size:.2f} TB"
+    # Unit index straight from the bit length (each unit is 2**10 larger), capped at TB
+    unit_idx = 0 if bytes_size <= 0 else min((int(bytes_size).bit_length() - 1) // 10, len(SIZE_UNITS) - 1)
+    return f"{bytes_size / (1 << (unit_idx * 10)):.2f} {SIZE_UNITS[unit_idx]}"
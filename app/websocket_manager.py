@@ -1,55 +1,166 @@
 from fastapi import WebSocket
-from typing import Dict, Set
+from typing import Dict, Optional, Tuple
 import asyncio
-import json
+import contextlib
+import logging
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Outbound messages buffered per client; when full the oldest is dropped
+# (status messages are full snapshots, so only the newest one matters)
+CLIENT_QUEUE_SIZE = 32
+
+# A client that can't take a status update within this time is dropped
+SEND_TIMEOUT_SECONDS = 5.0
+
+# Status updates for a job arriving within this window are coalesced into one broadcast
+BROADCAST_DEBOUNCE_SECONDS = 0.05
+
+# Statuses that are always broadcast immediately (the UI must never miss them)
+TERMINAL_STATUSES = frozenset({"completed", "failed"})
 
 
 class ConnectionManager:
     """Manages WebSocket connections for real-time job status updates"""
 
     def __init__(self):
-        # job_id -> Set of WebSocket connections
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
+        # job_id -> {WebSocket: (outbound queue, relay task - None until start_relay)}
+        self.active_connections: Dict[str, Dict[WebSocket, Tuple[asyncio.Queue, Optional[asyncio.Task]]]] = {}
+        # job_id -> latest status not yet broadcast, and the task that will flush it
+        self._pending_status: Dict[str, dict] = {}
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
+        # Open connections across all jobs (kept in step by connect/disconnect)
+        self._total_connections = 0
+
+    @property
+    def total_connections(self) -> int:
+        """Number of open WebSocket connections across all jobs"""
+        return self._total_connections
 
     async def connect(self, websocket: WebSocket, job_id: str):
-        """Accept WebSocket connection and subscribe to job updates"""
+        """
+        Accept WebSocket connection and subscribe to job updates
+
+        Updates are buffered but not sent until start_relay is called with the
+        job's current status, so subscribe first, then read the snapshot.
+        """
         await websocket.accept()
 
-        if job_id not in self.active_connections:
-            self.active_connections[job_id] = set()
+        connections = self.active_connections.setdefault(job_id, {})
+        connections[websocket] = (asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE), None)
+        self._total_connections += 1
+        logger.debug("Client connected to job %s. Total connections: %d", job_id, len(connections))
+
+    def start_relay(self, websocket: WebSocket, job_id: str, status_data: dict):
+        """
+        Send the job's current status, then every update buffered since connect
+
+        Updates queued while the snapshot was being read may be newer than it,
+        so the snapshot goes out first and they follow in order.
+        """
+        connections = self.active_connections.get(job_id)
+        entry = connections.get(websocket) if connections else None
+        if entry is None or entry[1] is not None:
+            return
+
+        queue = entry[0]
+        buffered = [queue.get_nowait() for _ in range(queue.qsize())]
+        queue.put_nowait(orjson.dumps(status_data).decode())
+        for payload in buffered[-(CLIENT_QUEUE_SIZE - 1):]:
+            queue.put_nowait(payload)
 
-        self.active_connections[job_id].add(websocket)
-        print(f"Client connected to job {job_id}. Total connections: {len(self.active_connections[job_id])}")
+        connections[websocket] = (queue, asyncio.create_task(self._relay(websocket, queue, job_id)))
 
     def disconnect(self, websocket: WebSocket, job_id: str):
         """Remove WebSocket connection"""
-        if job_id in self.active_connections:
-            self.active_connections[job_id].discard(websocket)
+        connections = self.active_connections.get(job_id)
+        if connections is not None:
+            entry = connections.pop(websocket, None)
+            if entry is not None:
+                self._total_connections -= 1
+                if entry[1] is not None and entry[1] is not asyncio.current_task():
+                    entry[1].cancel()
 
             # Clean up empty job subscriptions
-            if not self.active_connections[job_id]:
+            if not connections:
                 del self.active_connections[job_id]
 
-        print(f"Client disconnected from job {job_id}")
+        logger.debug("Client disconnected from job %s", job_id)
+
+    def queue_text(self, websocket: WebSocket, job_id: str, text: str):
+        """
+        Queue a text frame for one client, sent by its relay task
+
+        Dropped if the client's queue is full (a stalled client is about to be
+        disconnected anyway), so it can never push out a status update.
+        """
+        connections = self.active_connections.get(job_id)
+        entry = connections.get(websocket) if connections else None
+        if entry is not None and not entry[0].full():
+            entry[0].put_nowait(text)
+
+    async def _relay(self, websocket: WebSocket, queue: asyncio.Queue, job_id: str):
+        """Send queued messages to one client, so a slow socket only delays itself"""
+        try:
+            while True:
+                payload = await queue.get()
+                await asyncio.wait_for(websocket.send_text(payload), SEND_TIMEOUT_SECONDS)
+        except Exception as e:
+            # Dead or stalled connection
+            logger.debug("Error sending to client: %s", e)
+            self.disconnect(websocket, job_id)
+            # Close it so the client reconnects and gets a fresh snapshot
+            # (a still-open socket would silently stop receiving updates)
+            with contextlib.suppress(Exception):
+                await asyncio.wait_for(websocket.close(code=1011), SEND_TIMEOUT_SECONDS)
 
     async def broadcast_status(self, job_id: str, status_data: dict):
         """Broadcast status update to all clients subscribed to this job"""
-        if job_id not in self.active_connections:
+        connections = self.active_connections.get(job_id)
+        if not connections:
             return
 
-        # Remove disconnected clients while broadcasting
-        dead_connections = set()
+        # Serialize once for every client (text frame - the frontend JSON.parses it)
+        payload = orjson.dumps(status_data).decode()
+
+        # Hand off to each client's relay task - never waits on a socket
+        for queue, _ in connections.values():
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(payload)
+
+    async def queue_status(self, job_id: str, status_data: dict):
+        """
+        Broadcast a status update, coalescing bursts of updates for the same job
+
+        Intermediate updates within BROADCAST_DEBOUNCE_SECONDS are replaced by the
+        latest one. Terminal statuses are sent immediately and drop anything pending,
+        so a stale intermediate update can never arrive after them.
+        """
+        if status_data.get("status") in TERMINAL_STATUSES:
+            self._pending_status.pop(job_id, None)
+            task = self._flush_tasks.pop(job_id, None)
+            if task is not None:
+                task.cancel()
+            await self.broadcast_status(job_id, status_data)
+            return
+
+        if job_id not in self.active_connections:
+            return
 
-        for connection in self.active_connections[job_id]:
-            try:
-                await connection.send_json(status_data)
-            except Exception as e:
-                print(f"Error sending to client: {e}")
-                dead_connections.add(connection)
+        self._pending_status[job_id] = status_data
+        if job_id not in self._flush_tasks:
+            self._flush_tasks[job_id] = asyncio.create_task(self._flush_status(job_id))
 
-        # Clean up dead connections
-        for connection in dead_connections:
-            self.disconnect(connection, job_id)
+    async def _flush_status(self, job_id: str):
+        """Broadcast the latest pending status for a job once the debounce window ends"""
+        # If cancelled here, queue_status has already removed this task
+        await asyncio.sleep(BROADCAST_DEBOUNCE_SECONDS)
+        self._flush_tasks.pop(job_id, None)
+        status_data = self._pending_status.pop(job_id, None)
+        if status_data is not None:
+            await self.broadcast_status(job_id, status_data)
 
 
 # Global connection manager instance
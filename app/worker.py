@@ -0,0 +1,42 @@
+"""
+arq worker for video jobs (used when TASK_QUEUE=arq)
+
+Run with:
+    arq app.worker.WorkerSettings
+"""
+from app.routes import video
+from app.services.task_queue import arq_redis_settings
+from app.utils.file_manager import ensure_directories_exist
+from app.services.transcriber import warm_whisper_model
+
+
+async def process_video_job(ctx, *args):
+    await video.process_video_job(*args)
+
+
+async def process_with_settings(ctx, *args):
+    await video.process_with_settings(*args)
+
+
+async def download_and_process(ctx, *args):
+    await video.download_and_process(*args)
+
+
+async def render_video_with_captions(ctx, *args):
+    await video.render_video_with_captions(*args)
+
+
+async def startup(ctx):
+    ensure_directories_exist()
+    warm_whisper_model()
+
+
+class WorkerSettings:
+    """arq worker configuration"""
+    functions = [process_video_job, process_with_settings, download_and_process, render_video_with_captions]
+    on_startup = startup
+    redis_settings = arq_redis_settings()
+    # Matches cpu_pool so Whisper/FFmpeg jobs don't oversubscribe the machine
+    max_jobs = 4
+    # Transcribing and rendering long videos can take a while
+    job_timeout = 3600